@@ -0,0 +1,62 @@
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+# поля постов, которые читаются из связанных таблиц
+POST_RELATIONS = ('author', 'group')
+
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+}
+
+
+class FieldsError(ValueError):
+    pass
+
+
+def parse_fields(value, available):
+    """Поля из параметра ?fields=a,b; без него - все доступные."""
+    if not value:
+        return list(available)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise FieldsError(f'Неизвестные поля: {", ".join(unknown)}')
+    return fields
+
+
+def select_post_relations(queryset, fields):
+    """Присоединяет к выборке только таблицы запрошенных полей."""
+    related = [name for name in POST_RELATIONS if name in fields]
+    return queryset.select_related(*related) if related else queryset
+
+
+def serialize(obj, serializers, fields):
+    return {name: serializers[name](obj) for name in fields}
+
+
+def serialize_page(page, serializers, fields):
+    return {
+        'results': [serialize(obj, serializers, fields) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def serialize_author(author):
+    stats = getattr(author, 'stats', None)
+    return {
+        'username': author.username,
+        'full_name': author.get_full_name(),
+        'posts_count': stats.posts_count if stats else 0,
+        'followers_count': stats.followers_count if stats else 0,
+        'following_count': stats.following_count if stats else 0,
+    }
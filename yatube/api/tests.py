@@ -0,0 +1,107 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Anonimus')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        Post.objects.bulk_create([
+            Post(text=f'Тестовая запись {i}', author=cls.user,
+                 group=cls.group)
+            for i in range(settings.POST_COUNT + 3)
+        ])
+        cls.post = Post.objects.latest('pub_date', 'pk')
+        Comment.objects.create(post=cls.post, author=cls.user, text='Ответ')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url, **headers):
+        response = self.client.get(url, **headers)
+        return response, json.loads(response.content or 'null')
+
+    def test_endpoints(self):
+        """Каждый адрес отдает те же данные, что и HTML-страница."""
+        urls = {
+            reverse('api:index'): 'results',
+            reverse('api:group_list', args=(self.group.slug,)): 'group',
+            reverse('api:profile', args=(self.user.username,)): 'author',
+            reverse('api:post_detail', args=(self.post.pk,)): 'comments',
+        }
+        for url, key in urls.items():
+            with self.subTest(url=url):
+                response, data = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(key, data)
+        _, data = self.get(reverse('api:post_detail', args=(self.post.pk,)))
+        self.assertEqual(data['post']['author'], self.user.username)
+        self.assertEqual(data['comments']['results'][0]['text'], 'Ответ')
+
+    def test_cursor_pagination(self):
+        """Курсор next ведет на оставшиеся посты без повторов."""
+        _, first = self.get(reverse('api:index'))
+        self.assertEqual(len(first['results']), settings.POST_COUNT)
+        self.assertIsNone(first['previous'])
+        _, second = self.get(
+            reverse('api:index') + f'?after={first["next"]}'
+        )
+        self.assertEqual(len(second['results']), 3)
+        self.assertIsNone(second['next'])
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), settings.POST_COUNT + 3)
+        response, data = self.get(reverse('api:index') + '?after=broken')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', data)
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе только перечисленные поля."""
+        _, data = self.get(reverse('api:index') + '?fields=id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response, data = self.get(reverse('api:index') + '?fields=secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', data['error'])
+
+    def test_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока лента не изменилась."""
+        url = reverse('api:index')
+        response, _ = self.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response, _ = self.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.post.text = 'Исправленная запись'
+        self.post.save()
+        response, data = self.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['results'][0]['text'], 'Исправленная запись')
+
+    def test_not_modified_skips_page_query(self):
+        """Для 304 страница постов из базы не читается."""
+        url = reverse('api:index')
+        response, _ = self.get(url)
+        with self.assertNumQueries(1):
+            response, _ = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_changes_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('api:post_detail', args=(self.post.pk,))
+        response, _ = self.get(url)
+        Comment.objects.create(post=self.post, author=self.user, text='Еще')
+        response, _ = self.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
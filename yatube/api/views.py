@@ -0,0 +1,122 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from core.query_budget import query_budget
+from posts.conditional import (conditional_response, feed_state, newest,
+                               post_state)
+from posts.models import Group, Post, User
+from posts.paginator import CursorPaginator, InvalidCursor
+
+from .serializers import (COMMENT_FIELDS, POST_FIELDS, FieldsError,
+                          parse_fields, select_post_relations, serialize,
+                          serialize_author, serialize_page)
+
+JSON_OPTIONS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def api_view(view):
+    """Только GET/HEAD, ?fields= разобран в request.fields.
+
+    Неверные ?fields= и курсор страницы - ответ 400.
+    """
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            request.fields = parse_fields(
+                request.GET.get('fields'), POST_FIELDS
+            )
+            return view(request, *args, **kwargs)
+        except (FieldsError, InvalidCursor) as error:
+            return JsonResponse(
+                {'error': str(error)}, status=400,
+                json_dumps_params=JSON_OPTIONS
+            )
+    return wrapper
+
+
+def json_response(data):
+    return JsonResponse(data, json_dumps_params=JSON_OPTIONS)
+
+
+def post_page(request, posts):
+    paginator = CursorPaginator(
+        select_post_relations(posts, request.fields), settings.POST_COUNT
+    )
+    page = paginator.get_cursor_page(
+        after=request.GET.get('after'), before=request.GET.get('before')
+    )
+    return serialize_page(page, POST_FIELDS, request.fields)
+
+
+@query_budget(2)
+@api_view
+def index(request):
+    posts = Post.objects.all()
+    state, modified = feed_state(posts)
+    return conditional_response(
+        request, state, modified,
+        lambda: json_response(post_page(request, posts))
+    )
+
+
+@query_budget(3)
+@api_view
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.all()
+    state, modified = feed_state(posts)
+    state = (state, group.title, group.description)
+
+    def build():
+        return json_response({
+            'group': {'title': group.title, 'slug': group.slug,
+                      'description': group.description},
+            **post_page(request, posts),
+        })
+    return conditional_response(request, state, modified, build)
+
+
+@query_budget(3)
+@api_view
+def profile(request, username):
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.all()
+    state, modified = feed_state(posts)
+    data = serialize_author(author)
+    return conditional_response(
+        request, (state, data), modified,
+        lambda: json_response({'author': data, **post_page(request, posts)})
+    )
+
+
+@query_budget(3)
+@api_view
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        select_post_relations(Post.objects.all(), request.fields),
+        id=post_id
+    )
+    comments = post.comments.all()
+    state, modified = post_state(post, newest(comments, 'created'))
+
+    def build():
+        page = CursorPaginator(
+            comments.select_related('author'), settings.COMMENT_COUNT,
+            key='created'
+        ).get_cursor_page(
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
+        return json_response({
+            'post': serialize(post, POST_FIELDS, request.fields),
+            'comments': serialize_page(
+                page, COMMENT_FIELDS, list(COMMENT_FIELDS)
+            ),
+        })
+    return conditional_response(request, state, modified, build)
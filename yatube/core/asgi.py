@@ -0,0 +1,187 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+# частей ответа, которые поток отдает циклу событий, не дожидаясь
+# клиента; HttpResponse - одна часть, и поток сразу свободен
+STREAM_BUFFER = 4
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def scope_environ(scope, body, content_length):
+    """WSGI environ для HTTP-запроса ASGI с уже прочитанным телом.
+
+    В scope путь уже декодирован, а WSGI ждет байты UTF-8,
+    прочитанные как latin-1, - так их раскодирует Django.
+    """
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode().decode('latin-1'),
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'CONTENT_LENGTH': str(content_length),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        # повторные заголовки WSGI склеивает через запятую
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def call_wsgi(application, environ, emit):
+    """Передает emit сообщения ASGI с ответом WSGI-приложения.
+
+    Части ответа уходят по мере чтения, поэтому FileResponse
+    и StreamingHttpResponse не собираются в памяти целиком.
+    close() ответа посылает request_finished, который закрывает
+    соединения с БД текущего потока, поэтому ответ читается
+    до конца в том же потоке, где работал view.
+    """
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [
+            (name.lower().encode('latin-1'), value.encode('latin-1'))
+            for name, value in headers
+        ]
+
+    result = application(environ, start_response)
+    try:
+        emit({
+            'type': 'http.response.start',
+            'status': started['status'],
+            'headers': started['headers'],
+        })
+        for chunk in result:
+            if chunk:
+                emit({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        emit({'type': 'http.response.body'})
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не выполняет асинхронные view, поэтому они работают
+    в пуле из ASGI_THREADS потоков, а цикл событий читает запросы
+    и отправляет ответы. Медленный клиент обычной страницы ждет
+    на цикле событий и не держит поток, как в WSGI-сервере, где
+    поток занят до конца отправки ответа.
+    """
+
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            threads or settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError(f'Соединения {scope["type"]} не поддерживаются')
+
+    async def http(self, scope, receive, send):
+        # большое тело уходит во временный файл, как загрузки Django
+        with SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        ) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            content_length = body.tell()
+            body.seek(0)
+            await self.respond(
+                scope_environ(scope, body, content_length), send
+            )
+
+    async def respond(self, environ, send):
+        """Отправляет ответ, пока поток пула его читает.
+
+        Очередь ограничена, поэтому поток с длинным ответом ждет
+        медленного клиента, а не копит ответ в памяти. Если клиент
+        отвалился, поток прерывает чтение ответа и закрывает его.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(STREAM_BUFFER)
+        disconnected = threading.Event()
+
+        def emit(message):
+            if disconnected.is_set():
+                raise ClientDisconnected
+            asyncio.run_coroutine_threadsafe(
+                queue.put(message), loop
+            ).result()
+
+        def run():
+            try:
+                call_wsgi(self.wsgi_application, environ, emit)
+            finally:
+                if not disconnected.is_set():
+                    emit(None)
+
+        worker = loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            disconnected.set()
+            # освобождаем поток, если он ждет места в очереди
+            while not queue.empty():
+                queue.get_nowait()
+            raise
+        await worker
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from core.asgi import ASGIHandler, call_wsgi, scope_environ
+from posts.benchmarks import make_request, seed_dataset
+
+VIEWS = ('index', 'group_posts', 'profile')
+
+
+def http_scope(url, query, cookie):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': url,
+        'query_string': urlencode(query).encode(),
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+    }
+
+
+def split(scopes, options):
+    """Запросы поровну между клиентами, каждый шлет свои по очереди."""
+    clients = options['clients']
+    return [scopes[start::clients] for start in range(clients)]
+
+
+def summary(latencies, wall):
+    latencies = sorted(latencies)
+    return {
+        'rps': len(latencies) / wall,
+        'p50': statistics.median(latencies) * 1000,
+        'p95': latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность страниц чтения через WSGI '
+        'и ASGI при одинаковом числе потоков и медленных клиентах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--views', nargs='+', default=list(VIEWS))
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--clients', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--client-latency', type=float, default=20,
+            help='Сколько мс клиент принимает ответ.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(MEDIA_ROOT=media_root, DEBUG=False):
+                self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        cache.clear()
+        dataset = seed_dataset(
+            rng, users=100, groups=10, posts=2000, comments=5000,
+            follows=1000, images=0
+        )
+        client = Client()
+        client.force_login(dataset.reader)
+        cookie = (f'{settings.SESSION_COOKIE_NAME}='
+                  f'{client.cookies[settings.SESSION_COOKIE_NAME].value}')
+        wsgi = WSGIHandler()
+        asgi = ASGIHandler(wsgi, threads=options['threads'])
+        self.stdout.write(
+            f'{options["threads"]} потоков, {options["clients"]} клиентов, '
+            f'прием ответа {options["client_latency"]:.0f} мс'
+        )
+        self.stdout.write(
+            f'{"страница":<14}{"путь":<6}{"запр/с":>10}'
+            f'{"p50, мс":>10}{"p95, мс":>10}'
+        )
+        for view in options['views']:
+            scopes = [
+                http_scope(url, query, cookie)
+                for _, url, query in (
+                    make_request(view, dataset, rng)
+                    for _ in range(options['requests'])
+                )
+            ]
+            for path, result in (
+                ('wsgi', self.measure_wsgi(wsgi, scopes, options)),
+                ('asgi', self.measure_asgi(asgi, scopes, options)),
+            ):
+                self.stdout.write(
+                    f'{view:<14}{path:<6}{result["rps"]:>10.1f}'
+                    f'{result["p50"]:>10.1f}{result["p95"]:>10.1f}'
+                )
+
+    def measure_wsgi(self, wsgi, scopes, options):
+        """Поток WSGI-сервера занят, пока клиент принимает ответ.
+
+        Запросы клиентов ждут свободный поток в очереди по порядку,
+        как соединения в очереди сервера.
+        """
+        delay = options['client_latency'] / 1000
+
+        def serve(scope):
+            call_wsgi(wsgi, scope_environ(scope, b''))
+            time.sleep(delay)
+
+        def client(part):
+            latencies = []
+            for scope in part:
+                started = time.perf_counter()
+                server.submit(serve, scope).result()
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as server, \
+                ThreadPoolExecutor(options['clients']) as clients:
+            latencies = [
+                latency
+                for part in clients.map(client, split(scopes, options))
+                for latency in part
+            ]
+        return summary(latencies, time.perf_counter() - started)
+
+    def measure_asgi(self, asgi, scopes, options):
+        """Клиент принимает ответ на цикле событий, поток уже свободен."""
+        delay = options['client_latency'] / 1000
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if (message['type'] == 'http.response.body'
+                    and not message.get('more_body')):
+                await asyncio.sleep(delay)
+
+        async def client(part):
+            latencies = []
+            for scope in part:
+                started = time.perf_counter()
+                await asgi(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        async def serve_all():
+            return await asyncio.gather(
+                *(client(part) for part in split(scopes, options))
+            )
+
+        started = time.perf_counter()
+        latencies = [
+            latency for part in asyncio.run(serve_all()) for latency in part
+        ]
+        return summary(latencies, time.perf_counter() - started)
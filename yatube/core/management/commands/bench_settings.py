@@ -0,0 +1,74 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+PROFILES = ('dev', 'test', 'prod')
+
+# выполняется в чистом интерпретаторе с выбранным профилем
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+startup = time.perf_counter() - started
+from django.test import Client
+client = Client()
+timings = []
+for _ in range({requests}):
+    started = time.perf_counter()
+    client.get('{url}')
+    timings.append(time.perf_counter() - started)
+json.dump({{'startup': startup, 'first': timings[0],
+           'request': sorted(timings[1:])[len(timings) // 2]}}, sys.stdout)
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время запуска и накладные расходы на запрос '
+        'профилей настроек dev, test и prod.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--url', default='/about/tech/',
+            help='Страница без обращений к базе.'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<10}{"запуск, мс":>12}{"1-й запрос, мс":>16}'
+            f'{"запрос, мс":>12}'
+        )
+        for profile in PROFILES:
+            runs = [self.run_child(profile, options)
+                    for _ in range(options['runs'])]
+            startup, first, request = (
+                statistics.median(run[name] * 1000 for run in runs)
+                for name in ('startup', 'first', 'request')
+            )
+            self.stdout.write(
+                f'{profile:<10}{startup:>12.1f}{first:>16.1f}'
+                f'{request:>12.2f}'
+            )
+
+    def run_child(self, profile, options):
+        env = dict(
+            os.environ,
+            DJANGO_ENV=profile,
+            DJANGO_SETTINGS_MODULE='yatube.settings',
+        )
+        code = CHILD.format(requests=options['requests'], url=options['url'])
+        output = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=settings.BASE_DIR, env=env, check=True,
+            stdout=subprocess.PIPE
+        ).stdout
+        return json.loads(output)
@@ -0,0 +1,168 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection
+
+# границы корзин гистограмм в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def escape_label(value):
+    """Значение метки в кавычках формата Prometheus."""
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def format_labels(labels, **extra):
+    pairs = sorted({**dict(labels), **extra}.items())
+    if not pairs:
+        return ''
+    inner = ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in pairs
+    )
+    return '{' + inner + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = defaultdict(float)
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] += amount
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(labels)} {value:g}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[index] += 1
+            self.values[key] = counts, total + value
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total)
+                      for key, (counts, total) in self.values.items()}
+        for labels, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                yield (f'{self.name}_bucket'
+                       f'{format_labels(labels, le=bound)} {cumulative}')
+            yield f'{self.name}_sum{format_labels(labels)} {total:g}'
+            yield f'{self.name}_count{format_labels(labels)} {cumulative}'
+
+
+class Registry:
+    """Метрики одного процесса в текстовом формате Prometheus."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def histogram(self, name, documentation):
+        return self.register(Histogram(name, documentation))
+
+    def exposition(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    'yatube_requests_total', 'Запросы по view и классу ответа.'
+)
+view_seconds = registry.histogram(
+    'yatube_view_seconds', 'Время обработки запроса view.'
+)
+db_seconds = registry.histogram(
+    'yatube_db_seconds', 'Время SQL-запросов за один запрос к view.'
+)
+db_queries_total = registry.counter(
+    'yatube_db_queries_total', 'SQL-запросы по view.'
+)
+template_seconds = registry.histogram(
+    'yatube_template_render_seconds', 'Время рендеринга шаблона.'
+)
+cache_total = registry.counter(
+    'yatube_cache_total', 'Обращения к кэшу фрагментов по результату.'
+)
+
+
+class QueryTimer:
+    """Суммирует время SQL-запросов, выполненных через connection."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """Время view, время и число SQL-запросов для каждого запроса."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        requests_total.inc(
+            view=view, status=f'{response.status_code // 100}xx'
+        )
+        view_seconds.observe(elapsed, view=view)
+        db_seconds.observe(timer.seconds, view=view)
+        db_queries_total.inc(timer.count, view=view)
+        return response
@@ -0,0 +1,34 @@
+import cProfile
+import os
+import random
+import time
+
+from django.conf import settings
+
+
+class ProfilingMiddleware:
+    """Профилирует cProfile долю запросов PROFILE_SAMPLE_RATE.
+
+    Профиль каждого выбранного запроса сохраняется в PROFILE_DIR
+    файлом .prof, который открывают snakeviz или flameprof.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILE_SAMPLE_RATE:
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        match = request.resolver_match
+        view = match.view_name.replace(':', '.') if match else 'unresolved'
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(os.path.join(
+            settings.PROFILE_DIR, f'{view}-{time.time_ns()}.prof'
+        ))
+        return response
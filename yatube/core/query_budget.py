@@ -0,0 +1,123 @@
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+IN_LIST_RE = re.compile(r'IN \((?:%s, )*%s\)')
+NUMBER_RE = re.compile(r'\b\d+\b')
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """Форма запроса: литералы и списки IN (...) заменены заглушками."""
+    sql = STRING_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return NUMBER_RE.sub('?', sql)
+
+
+class QueryRecorder:
+    """Запоминает SQL всех запросов, выполненных через connection."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def repeated(self, threshold=None):
+        """Формы запросов, повторенные не меньше threshold раз.
+
+        Один и тот же запрос с разными параметрами в цикле -
+        признак N+1 в шаблоне или во view.
+        """
+        threshold = threshold or settings.QUERY_REPEAT_THRESHOLD
+        shapes = Counter(normalize_sql(sql) for sql in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common()
+                if count >= threshold]
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def query_budget(limit):
+    """Задает view максимальное число SQL-запросов на один запрос."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def check_budget(recorder, budget, label):
+    """Список нарушений: превышение бюджета и повторяющиеся запросы."""
+    problems = []
+    if budget is not None and len(recorder) > budget:
+        problems.append(
+            f'{label}: {len(recorder)} SQL-запросов при бюджете {budget}'
+        )
+    for shape, count in recorder.repeated():
+        problems.append(f'{label}: N+1, {count} раз {shape}')
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """Считает SQL-запросы части запросов и сообщает о нарушениях.
+
+    Доля проверяемых запросов задает QUERY_BUDGET_SAMPLE_RATE.
+    В строгом режиме (QUERY_BUDGET_STRICT, включен в тестах)
+    нарушение вызывает исключение, иначе пишется в лог.
+
+    Обертка ставится на соединение потока запроса, и run_concurrently
+    переносит ее на соединения своих потоков. Фоновые пулы вроде
+    генерации миниатюр работают уже после ответа и в бюджет
+    не входят, поэтому к базе они не обращаются.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+            return self.get_response(request)
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        problems = check_budget(
+            recorder, getattr(request, 'query_budget', None), request.path
+        )
+        if problems:
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded('\n'.join(problems))
+            logger.warning('\n'.join(problems))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
+
+
+class QueryBudgetTestMixin:
+    """Проверки числа и повторяемости запросов для TestCase."""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with record_queries() as recorder:
+            yield recorder
+        problems = check_budget(recorder, budget, 'блок')
+        if problems:
+            self.fail('\n'.join(problems))
@@ -0,0 +1,69 @@
+import logging
+import os
+import time
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders import cached
+
+logger = logging.getLogger(__name__)
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+class Loader(cached.Loader):
+    """Кэширующий загрузчик, который перечитывает измененные файлы.
+
+    Для разработки: шаблон компилируется один раз и берется из кэша,
+    пока у файла не изменится время модификации. Ненайденные шаблоны
+    не кэшируются, чтобы новый файл подхватывался сразу.
+    """
+
+    def get_template(self, template_name, skip=None):
+        key = self.cache_key(template_name, skip)
+        cached_template = self.get_template_cache.get(key)
+        if cached_template is not None and not self.is_fresh(cached_template):
+            del self.get_template_cache[key]
+        template = super().get_template(template_name, skip)
+        if not hasattr(template, 'mtime'):
+            template.mtime = file_mtime(template.origin.name)
+        return template
+
+    def is_fresh(self, template):
+        mtime = getattr(template, 'mtime', None)
+        return mtime is not None and mtime == file_mtime(template.origin.name)
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.html'):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    """Компилирует все шаблоны из DIRS, чтобы первый запрос их не ждал.
+
+    Вызывается при старте воркера. Возвращает число шаблонов
+    и затраченное время в секундах.
+    """
+    started = time.perf_counter()
+    count = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for directory in backend.engine.dirs:
+            for name in sorted(template_names(directory)):
+                try:
+                    backend.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Шаблон %s не компилируется', name)
+                else:
+                    count += 1
+    return count, time.perf_counter() - started
@@ -0,0 +1,73 @@
+import time
+
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from ..metrics import cache_total
+
+register = template.Library()
+
+# устаревшая копия хранится дольше свежей, чтобы было что отдавать
+STALE_FACTOR = 4
+LOCK_TIMEOUT = 30
+
+
+class StaleCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, version, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.version = version
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = int(self.timeout.resolve(context))
+        version = self.version.resolve(context)
+        key = make_template_fragment_key(
+            self.name, [var.resolve(context) for var in self.vary_on]
+        )
+        entry = cache.get(key)
+        if entry is not None:
+            entry_version, expires, content = entry
+            if entry_version == version and expires > time.time():
+                cache_total.inc(fragment=self.name, result='hit')
+                return content
+            if not cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+                cache_total.inc(fragment=self.name, result='stale')
+                return content
+        cache_total.inc(fragment=self.name, result='miss')
+        content = self.nodelist.render(context)
+        cache.set(
+            key,
+            (version, time.time() + timeout, content),
+            timeout * STALE_FACTOR
+        )
+        cache.delete(f'{key}:lock')
+        return content
+
+
+@register.tag('stale_cache')
+def do_stale_cache(parser, token):
+    """Кэширует фрагмент, отдавая устаревшую копию на время пересборки.
+
+    {% stale_cache timeout name version [vary_on ...] %}
+
+    Копия устаревает по таймауту или при смене version. Пересобирает
+    ее только запрос, взявший блокировку; остальные тем временем
+    получают прежний HTML вместо одновременной пересборки.
+    """
+    nodelist = parser.parse(('endstale_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 4:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 3 arguments."
+        )
+    return StaleCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        parser.compile_filter(tokens[3]),
+        [parser.compile_filter(token) for token in tokens[4:]],
+    )
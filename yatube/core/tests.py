@@ -1,9 +1,313 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import pstats
+import shutil
+import tempfile
 from http import HTTPStatus
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.http import HttpResponse
+from django.template import Context, Engine, Template
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Group, User
+
+from .asgi import ASGIHandler, scope_environ
+from .metrics import Histogram
+from .query_budget import (QueryBudgetExceeded, QueryBudgetMiddleware,
+                           normalize_sql, query_budget)
+from .template_loaders import template_names, warm_templates
+
+FILE_CACHE_DIR = tempfile.mkdtemp()
+PROFILE_DIR = tempfile.mkdtemp()
+
 
 class WiewTestClass(TestCase):
     def test_error_page_404(self):
         response = self.client.get('/unexisting_page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': FILE_CACHE_DIR,
+}})
+class StaleCacheTagTest(TestCase):
+    template = Template(
+        '{% load stale_cache %}'
+        '{% stale_cache 60 fragment version %}{{ text }}{% endstale_cache %}'
+    )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(FILE_CACHE_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, version, text):
+        return self.template.render(
+            Context({'version': version, 'text': text})
+        )
+
+    def test_fresh_copy_served(self):
+        """Пока версия не сменилась, фрагмент берется из кэша."""
+        self.assertEqual(self.render(1, 'old'), 'old')
+        self.assertEqual(self.render(1, 'new'), 'old')
+
+    def test_stale_copy_served_during_rebuild(self):
+        """Пока другой воркер пересобирает фрагмент, отдается старый."""
+        lock = f'{make_template_fragment_key("fragment")}:lock'
+        self.render(1, 'old')
+        cache.add(lock, 1)
+        self.assertEqual(self.render(2, 'new'), 'old')
+        cache.delete(lock)
+        self.assertEqual(self.render(2, 'new'), 'new')
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_normalize_sql(self):
+        """Запросы, отличающиеся литералами, имеют одну форму."""
+        self.assertEqual(
+            normalize_sql("SELECT a FROM t WHERE id IN (%s, %s) "
+                          "AND name = 'x' LIMIT 21"),
+            normalize_sql("SELECT a FROM t WHERE id IN (%s) "
+                          "AND name = 'y' LIMIT 5"),
+        )
+
+    def test_repeated_queries_flagged(self):
+        """Одинаковые запросы в цикле отмечаются как N+1."""
+        def view(request):
+            for pk in range(settings.QUERY_REPEAT_THRESHOLD):
+                User.objects.filter(pk=pk).exists()
+            return HttpResponse()
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'N+1'):
+            QueryBudgetMiddleware(view)(self.request)
+
+    def test_budget_exceeded(self):
+        """View с бюджетом не может сделать больше запросов."""
+        @query_budget(1)
+        def view(request):
+            User.objects.count()
+            Group.objects.count()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        middleware.process_view(self.request, view, (), {})
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджете 1'):
+            middleware(self.request)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_offenders_logged(self):
+        """Вне тестов нарушения только пишутся в лог."""
+        @query_budget(0)
+        def view(request):
+            User.objects.count()
+            return HttpResponse()
+
+        middleware = QueryBudgetMiddleware(view)
+        middleware.process_view(self.request, view, (), {})
+        with self.assertLogs('core.query_budget', 'WARNING'):
+            middleware(self.request)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+    def test_metrics_exposed(self):
+        """После запроса /metrics/ отдает время view, SQL и шаблонов."""
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        for sample in (
+            'yatube_view_seconds_count{view="posts:index"}',
+            'yatube_db_queries_total{view="posts:index"}',
+            'yatube_template_render_seconds_bucket'
+            '{le="+Inf",template="posts/index.html"}',
+            'yatube_cache_total{fragment="index_posts",result="miss"}',
+        ):
+            with self.subTest(sample=sample):
+                self.assertContains(response, sample)
+
+    def test_metrics_only_with_token(self):
+        """Без токена /metrics/ не виден, даже с внутреннего адреса."""
+        for authorization in ('', 'Bearer wrong'):
+            with self.subTest(authorization=authorization):
+                response = self.client.get(
+                    reverse('metrics'), HTTP_AUTHORIZATION=authorization
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_FOUND
+                )
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get(
+                reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+            )
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_label_values_escaped(self):
+        """Обратная косая черта, кавычки и переводы строк экранируются."""
+        histogram = Histogram('test_seconds', 'Тест', buckets=())
+        histogram.observe(1, view='a\\b"c\nd')
+        self.assertIn(
+            'test_seconds_count{view="a\\\\b\\"c\\nd"} 1',
+            list(histogram.samples())
+        )
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины гистограммы накопительные."""
+        histogram = Histogram('test_seconds', 'Тест', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, view='v')
+        self.assertEqual(list(histogram.samples()), [
+            'test_seconds_bucket{le="0.1",view="v"} 1',
+            'test_seconds_bucket{le="1.0",view="v"} 2',
+            'test_seconds_bucket{le="+Inf",view="v"} 3',
+            'test_seconds_sum{view="v"} 5.55',
+            'test_seconds_count{view="v"} 3',
+        ])
+
+
+@override_settings(PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=PROFILE_DIR)
+class ProfilingTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILE_DIR, ignore_errors=True)
+
+    def test_profile_dumped(self):
+        """Выбранный запрос сохраняет профиль cProfile."""
+        self.client.get(reverse('posts:index'))
+        names = os.listdir(PROFILE_DIR)
+        self.assertEqual(len(names), 1)
+        self.assertTrue(names[0].startswith('posts.index-'))
+        pstats.Stats(os.path.join(PROFILE_DIR, names[0]))
+
+
+class TemplateLoaderTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'page.html')
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.engine = Engine(dirs=[self.directory], loaders=[
+            ('core.template_loaders.Loader',
+             ['django.template.loaders.filesystem.Loader']),
+        ])
+
+    def write(self, text, mtime):
+        with open(self.path, 'w') as file:
+            file.write(text)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_template_reloaded_on_change(self):
+        self.write('старый', 1000)
+        template = self.engine.get_template('page.html')
+        self.assertIs(self.engine.get_template('page.html'), template)
+        self.write('новый', 2000)
+        self.assertEqual(
+            self.engine.get_template('page.html').render(Context()), 'новый'
+        )
+
+    def test_warm_templates_compiles_all(self):
+        count, _ = warm_templates()
+        self.assertEqual(
+            count, len(list(template_names(settings.TEMPLATES_DIR)))
+        )
+
+
+def run_asgi(application, scope, messages):
+    """Отдает приложению сообщения клиента, возвращает отправленные им."""
+    incoming = list(messages)
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    return sent
+
+
+class ASGIHandlerTest(SimpleTestCase):
+    def setUp(self):
+        self.application = ASGIHandler(WSGIHandler(), threads=2)
+        self.addCleanup(self.application.executor.shutdown)
+
+    def test_serves_django_response(self):
+        sent = run_asgi(self.application, {
+            'type': 'http', 'method': 'GET', 'path': reverse('about:tech'),
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        }, [{'type': 'http.request', 'body': b''}])
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], HTTPStatus.OK)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'), sent[0]['headers']
+        )
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Технологии'.encode(), body)
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_environ_from_scope(self):
+        request = WSGIRequest(scope_environ({
+            'type': 'http', 'method': 'POST', 'path': '/группа/',
+            'query_string': 'q=пост'.encode(),
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'x-tag', b'a'), (b'x-tag', b'b'),
+            ],
+        }, io.BytesIO(b'data'), 4))
+        self.assertEqual(request.path, '/группа/')
+        self.assertEqual(request.GET['q'], 'пост')
+        self.assertEqual(request.META['HTTP_X_TAG'], 'a,b')
+        self.assertEqual(request.content_type, 'text/plain')
+        self.assertEqual(request.body, b'data')
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=4)
+    def test_body_spooled_and_response_streamed(self):
+        def application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            body = environ['wsgi.input']
+            # тело больше FILE_UPLOAD_MAX_MEMORY_SIZE лежит на диске
+            self.assertTrue(body._rolled)
+            self.assertEqual(environ['CONTENT_LENGTH'], '10')
+            return iter([body.read(), b'', b'tail'])
+
+        handler = ASGIHandler(application, threads=1)
+        self.addCleanup(handler.executor.shutdown)
+        sent = run_asgi(handler, {
+            'type': 'http', 'method': 'POST', 'path': '/',
+            'query_string': b'', 'headers': [],
+        }, [
+            {'type': 'http.request', 'body': b'first', 'more_body': True},
+            {'type': 'http.request', 'body': b'+rest'},
+        ])
+        self.assertEqual(
+            [message.get('body') for message in sent[1:]],
+            [b'first+rest', b'tail', None]
+        )
+        self.assertTrue(sent[1]['more_body'])
+
+    def test_lifespan(self):
+        sent = run_asgi(self.application, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'},
+        ])
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
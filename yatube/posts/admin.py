@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.contrib import admin
 
-from .models import Group, Post, Comment, Follow
+from .models import (Group, GroupAuthorStats, GroupStats, Post, Comment,
+                     Follow, UserStats)
+from .search import get_search_backend
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -17,8 +20,19 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        ids = get_search_backend().ranked_ids(
+            search_term, 0, settings.SEARCH_MAX_RESULTS
+        )
+        return queryset.filter(pk__in=ids), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
 admin.site.register(Comment)
 admin.site.register(Follow)
+admin.site.register(UserStats)
+admin.site.register(GroupStats)
+admin.site.register(GroupAuthorStats)
@@ -0,0 +1,277 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from PIL import Image
+
+from core.query_budget import record_queries
+
+from .counters import rebuild_counters, rebuild_group_stats
+from .models import Comment, Follow, Group, Post, User
+from .popular import rebuild_popularity
+from .search import get_search_backend
+from .thumbnails import generate_thumbnails
+
+READ_VIEWS = (
+    'index', 'popular', 'group_index', 'group_posts', 'profile',
+    'post_detail', 'follow_index',
+)
+WRITE_VIEWS = ('post_create', 'add_comment', 'profile_follow')
+# ключ базового замера с параметрами, при которых он снят
+PARAMETERS = 'parameters'
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Dataset:
+    """Синтетические данные, по которым строятся запросы к страницам."""
+
+    def __init__(self, reader, usernames, slugs, post_ids):
+        self.reader = reader
+        self.usernames = usernames
+        self.slugs = slugs
+        self.post_ids = post_ids
+
+
+def percentile(samples, percent):
+    """Значение, не больше которого percent процентов выборки."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+def make_images(count, rng):
+    names = []
+    for number in range(count):
+        buffer = BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', (960, 640), color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/bench-{number}.jpg', ContentFile(buffer.getvalue())
+        ))
+        # готовые миниатюры меняют версию ленты, поэтому создаются
+        # заранее, а не в фоне посреди замера
+        generate_thumbnails(names[-1])
+    return names
+
+
+def seed_dataset(rng, users=100, groups=10, posts=2000, comments=5000,
+                 follows=1000, images=20):
+    """Заполняет базу пользователями, группами, постами и подписками.
+
+    Посты и комментарии пишутся bulk_create, поэтому счетчики,
+    популярность и поисковый индекс потом пересчитываются целиком. Подписки
+    создаются по одной, чтобы сигналы заполнили ленты.
+    """
+    User.objects.bulk_create(
+        [User(username=f'bench{number}', password='!')
+         for number in range(users)]
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench'
+    ).values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        [Group(title=f'Группа {number}', slug=f'bench-{number}',
+               description='Описание группы') for number in range(groups)]
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-'
+    ).values_list('pk', flat=True))
+    image_names = make_images(images, rng)
+    Post.objects.bulk_create(
+        [Post(text=f'Запись {number} ' + 'текст ' * rng.randrange(5, 50),
+              author_id=rng.choice(user_ids),
+              group_id=rng.choice(group_ids + [None]),
+              image=rng.choice(image_names) if image_names
+              and rng.random() < 0.3 else None)
+         for number in range(posts)]
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        [Comment(post_id=rng.choice(post_ids),
+                 author_id=rng.choice(user_ids),
+                 text=f'Комментарий {number}')
+         for number in range(comments)]
+    )
+    rebuild_counters()
+    rebuild_group_stats()
+    rebuild_popularity()
+    get_search_backend().rebuild()
+    reader = user_ids[0]
+    pairs = {(reader, author) for author in user_ids[1:11]}
+    while len(pairs) < min(follows, users * (users - 1)):
+        user, author = rng.choice(user_ids), rng.choice(user_ids)
+        if user != author:
+            pairs.add((user, author))
+    for user, author in pairs:
+        Follow.objects.create(user_id=user, author_id=author)
+    return Dataset(
+        reader=User.objects.get(pk=reader),
+        usernames=list(User.objects.filter(
+            pk__in=user_ids
+        ).values_list('username', flat=True)),
+        slugs=list(Group.objects.filter(
+            pk__in=group_ids
+        ).values_list('slug', flat=True)),
+        post_ids=post_ids,
+    )
+
+
+# адрес и данные запроса к каждой странице; случайные посты,
+# авторы и группы берутся из набора данных
+REQUESTS = {
+    'index': lambda dataset, rng: (
+        'get', reverse('posts:index'), {}
+    ),
+    'popular': lambda dataset, rng: (
+        'get', reverse('posts:popular'), {'page': rng.randrange(1, 6)}
+    ),
+    'group_index': lambda dataset, rng: (
+        'get', reverse('posts:group_index'), {}
+    ),
+    'group_posts': lambda dataset, rng: (
+        'get',
+        reverse('posts:group_list', args=(rng.choice(dataset.slugs),)), {}
+    ),
+    'profile': lambda dataset, rng: (
+        'get',
+        reverse('posts:profile', args=(rng.choice(dataset.usernames),)), {}
+    ),
+    'post_detail': lambda dataset, rng: (
+        'get',
+        reverse('posts:post_detail', args=(rng.choice(dataset.post_ids),)),
+        {}
+    ),
+    'follow_index': lambda dataset, rng: (
+        'get', reverse('posts:follow_index'), {}
+    ),
+    'post_create': lambda dataset, rng: (
+        'post', reverse('posts:post_create'), {'text': 'Новая запись'}
+    ),
+    'add_comment': lambda dataset, rng: (
+        'post',
+        reverse('posts:add_comment', args=(rng.choice(dataset.post_ids),)),
+        {'text': 'Новый комментарий'}
+    ),
+    'profile_follow': lambda dataset, rng: (
+        'get',
+        reverse('posts:profile_follow',
+                args=(rng.choice(dataset.usernames),)),
+        {}
+    ),
+}
+
+
+def make_request(view, dataset, rng):
+    """Метод, адрес и данные очередного запроса к странице view."""
+    if view not in REQUESTS:
+        raise BenchmarkError(f'Неизвестная страница {view}')
+    return REQUESTS[view](dataset, rng)
+
+
+@contextmanager
+def injected_latency(seconds):
+    """Задержка перед каждым SQL-запросом, как у базы по сети.
+
+    Обертка запросов переносится и в потоки run_concurrently.
+    """
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(delay):
+        yield
+
+
+def send(session_key, requests, db_latency=0):
+    """Выполняет запросы одним клиентом, возвращает время и число SQL.
+
+    Запросы считаются обертками соединения, поэтому учитываются
+    и выполненные в потоках run_concurrently.
+    """
+    client = Client()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+    samples = []
+    for method, url, data in requests:
+        with record_queries() as queries, \
+                injected_latency(db_latency / 1000):
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            raise BenchmarkError(f'{url}: ответ {response.status_code}')
+        samples.append((elapsed, len(queries)))
+    return samples
+
+
+def measure(view, dataset, session_key, rng, requests=100, concurrency=1,
+            warmup=5, db_latency=0):
+    """Задержки p50/p95/p99 в мс, запросы в секунду и SQL на запрос.
+
+    Первые warmup запросов прогревают кэши и не учитываются.
+    db_latency - задержка в мс перед каждым SQL-запросом.
+    """
+    send(session_key, [
+        make_request(view, dataset, rng) for _ in range(warmup)
+    ])
+    batch = [make_request(view, dataset, rng) for _ in range(requests)]
+    started = time.perf_counter()
+    if concurrency == 1:
+        samples = send(session_key, batch, db_latency)
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = [
+                sample for chunk in executor.map(
+                    lambda part: send(session_key, part, db_latency),
+                    [batch[start::concurrency]
+                     for start in range(concurrency)]
+                )
+                for sample in chunk
+            ]
+    wall = time.perf_counter() - started
+    latencies = [elapsed * 1000 for elapsed, _ in samples]
+    return {
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'rps': len(samples) / wall,
+        'queries': sum(count for _, count in samples) / len(samples),
+    }
+
+
+def find_regressions(results, baseline, tolerance=None):
+    """Страницы, которые стали чаще ходить в БД или медленнее замера.
+
+    Число SQL-запросов сравнивается строго. Задержка p95 зависит
+    от машины, поэтому сравнивается, только если задан допуск
+    tolerance, и только с замером, в котором она есть.
+    """
+    regressions = []
+    for view, result in results.items():
+        if view == PARAMETERS:
+            continue
+        base = baseline.get(view)
+        if base is None:
+            continue
+        if round(result['queries'], 1) > round(base['queries'], 1):
+            regressions.append(
+                f'{view}: {result["queries"]:.1f} SQL-запросов '
+                f'вместо {base["queries"]:.1f}'
+            )
+        if tolerance is None or 'p95' not in base:
+            continue
+        if result['p95'] > base['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{view}: p95 {result["p95"]:.1f} мс '
+                f'вместо {base["p95"]:.1f} мс'
+            )
+    return regressions
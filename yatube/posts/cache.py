@@ -0,0 +1,74 @@
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'posts:feed_version'
+FEED_MODIFIED_KEY = 'posts:feed_modified'
+COMMENTS_VERSION_KEY = 'posts:comments_version:{}'
+FOLLOWS_POPULAR_KEY = 'posts:follows_popular:{}'
+
+
+def get_feed_version():
+    """Текущая версия ленты, входит в ключи кэша ее фрагментов."""
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        cache.add(FEED_VERSION_KEY, 1, None)
+        version = cache.get(FEED_VERSION_KEY, 1)
+    return version
+
+
+def get_feed_modified():
+    """Время последнего изменения ленты в секундах Unix.
+
+    Если кэш его потерял, изменением считается текущий момент.
+    """
+    modified = cache.get(FEED_MODIFIED_KEY)
+    if modified is None:
+        cache.add(FEED_MODIFIED_KEY, time.time(), None)
+        modified = cache.get(FEED_MODIFIED_KEY, time.time())
+    return modified
+
+
+def bump_feed_version():
+    """Делает устаревшими все закэшированные фрагменты ленты."""
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.add(FEED_VERSION_KEY, 1, None)
+    cache.set(FEED_MODIFIED_KEY, time.time(), None)
+
+
+def get_comments_versions(post_ids):
+    """Версии комментариев постов в порядке post_ids.
+
+    None - комментарии поста не менялись с тех пор, как его версию
+    вытеснили из кэша, или не менялись вовсе.
+    """
+    keys = [COMMENTS_VERSION_KEY.format(pk) for pk in post_ids]
+    versions = cache.get_many(keys)
+    return tuple(versions.get(key) for key in keys)
+
+
+def bump_comments_version(post_id):
+    """Делает устаревшими фрагменты и валидаторы страниц с этим постом.
+
+    Версия - случайная строка, а не счетчик: счетчик после
+    вытеснения из кэша начался бы заново и мог совпасть с версией,
+    которая уже лежит в ключе фрагмента.
+    """
+    cache.set(COMMENTS_VERSION_KEY.format(post_id), uuid4().hex, None)
+    cache.set(FEED_MODIFIED_KEY, time.time(), None)
+
+
+def get_follows_popular(user_id):
+    """Подсказка: в прошлый раз у читателя нашлись популярные подписки.
+
+    Неверная подсказка стоит только лишнего чтения ленты, поэтому
+    ее хватает и в кэше процесса.
+    """
+    return cache.get(FOLLOWS_POPULAR_KEY.format(user_id), False)
+
+
+def set_follows_popular(user_id, follows_popular):
+    cache.set(FOLLOWS_POPULAR_KEY.format(user_id), follows_popular, None)
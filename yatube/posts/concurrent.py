@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.CONCURRENT_QUERY_THREADS,
+                thread_name_prefix='queries'
+            )
+    return _executor
+
+
+def call_in_worker(call, wrappers):
+    """Вызов в потоке пула со своим соединением с БД.
+
+    На соединение потока ставятся обертки запросов вызывающего
+    потока, поэтому бюджет запросов и метрики видят и эти запросы.
+    После вызова соединение закрывается по правилам CONN_MAX_AGE,
+    как в конце обычного запроса.
+    """
+    try:
+        with ExitStack() as stack:
+            for wrapper in wrappers:
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            return call()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(*calls):
+    """Выполняет независимые чтения одновременно, возвращает их результаты.
+
+    Первый вызов выполняется в текущем потоке, остальные - в пуле
+    CONCURRENT_QUERY_THREADS потоков. Исключение вызова поднимается
+    здесь же. Другие соединения не видят изменений незавершенной
+    транзакции, поэтому внутри atomic() вызовы идут по очереди
+    в текущем потоке, как и при CONCURRENT_QUERY_THREADS = 0.
+    """
+    if (len(calls) < 2 or not settings.CONCURRENT_QUERY_THREADS
+            or connection.in_atomic_block):
+        return [call() for call in calls]
+    wrappers = list(connection.execute_wrappers)
+    futures = [
+        get_executor().submit(call_in_worker, call, wrappers)
+        for call in calls[1:]
+    ]
+    try:
+        first = calls[0]()
+    finally:
+        # чтения в пуле дожидаются, даже если первое упало
+        wait(futures)
+    return [first, *(future.result() for future in futures)]
@@ -0,0 +1,169 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .cache import (get_comments_versions, get_feed_modified,
+                    get_feed_version)
+
+# посты страницы при текущей версии ленты, для ее валидатора
+PAGE_POSTS_TTL = 60 * 60 * 24
+
+
+def newest(queryset, field):
+    """Самое позднее значение поля даты, одним запросом по индексу."""
+    return queryset.order_by(f'-{field}').values_list(
+        field, flat=True
+    ).first()
+
+
+def feed_state(posts=None):
+    """Состояние ленты для валидатора и время ее изменения.
+
+    Версия ленты в общем кэше меняется при любом сохранении
+    и удалении поста или группы. Кэш процесса не знает о правках
+    в других воркерах, поэтому без общего кэша в состояние ленты
+    из posts входят дата последнего изменения ее постов и сумма
+    их id: правка двигает дату, удаление меняет сумму. Оба агрегата
+    читаются из индекса (группа или автор, updated). Без posts
+    валидатору без общего кэша не на что опереться, состояние -
+    None и валидаторов нет.
+    """
+    if settings.SHARED_CACHE:
+        stamp = None
+    elif posts is None:
+        return None, None
+    else:
+        stamp = posts.aggregate(updated=Max('updated'), ids=Sum('pk'))
+    return (get_feed_version(), stamp), modified_at(
+        stamp and stamp['updated']
+    )
+
+
+def post_state(post, latest):
+    """Состояние страницы поста: версия ленты и его комментарии.
+
+    latest - дата последнего комментария, ее читает вызывающий,
+    чтобы запрос шел одновременно с чтением поста. Post.updated
+    двигают и правки поста, и его комментарии.
+    """
+    comments = (get_comments_versions([post.pk]), post.comments_count,
+                latest)
+    return (get_feed_version(), post.updated, comments), modified_at(
+        post.updated, latest
+    )
+
+
+def modified_at(*moments):
+    """Время изменения для Last-Modified: версии ленты или ее постов."""
+    return max([get_feed_modified(), *(
+        moment.timestamp() for moment in moments if moment is not None
+    )])
+
+
+def page_posts_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page_posts:{get_feed_version()}:{path}'
+
+
+def remember_page(request, page):
+    """Запоминает посты, которые показала страница ленты.
+
+    Состав страницы меняется только вместе с версией ленты,
+    поэтому список хранится под ней.
+    """
+    cache.set(page_posts_key(request), [post.pk for post in page],
+              PAGE_POSTS_TTL)
+    return page
+
+
+def page_comments(request):
+    """Версии комментариев постов страницы ленты.
+
+    Комментарий меняет версию только своего поста, поэтому
+    фрагменты и валидаторы других страниц не устаревают. None -
+    страница еще не строилась при текущей версии ленты.
+    """
+    post_ids = cache.get(page_posts_key(request))
+    if post_ids is None:
+        return None
+    return get_comments_versions(post_ids)
+
+
+def has_validators(request):
+    """Запрос может закончиться 304, и страницу читать заранее не стоит."""
+    return ('HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+
+def viewer_state(request):
+    """Часть страницы, которая зависит от читателя.
+
+    Авторизованному пользователю страница показывает его имя
+    и формы с CSRF-токеном, поэтому в валидатор входят его id
+    и секрет CSRF из cookie.
+    """
+    if not request.user.is_authenticated:
+        return None
+    return request.user.pk, request.META.get('CSRF_COOKIE')
+
+
+def conditional_response(request, state, modified, build):
+    """Ответ build() с ETag и Last-Modified или 304 без его построения.
+
+    state - все, от чего зависит ответ, кроме самой страницы записей.
+    ETag считается по нему и адресу с параметрами, поэтому на 304
+    страница не выбирается из базы и шаблон не рендерится.
+    Без state ответ отдается без валидаторов.
+    """
+    if request.method not in ('GET', 'HEAD') or state is None:
+        return build()
+    etag = quote_etag(hashlib.md5(
+        repr((request.get_full_path(), state)).encode()
+    ).hexdigest())
+    last_modified = int(modified)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def page_response(request, state, modified, build, with_comments=False):
+    """HTML-страница ленты с валидатором и заголовками кэширования.
+
+    Страницы анонимов без cookie в ответе может хранить прокси
+    (s-maxage), браузер каждый раз проверяет их по ETag.
+    Страницы пользователей кэширует только браузер.
+    with_comments - страница показывает комментарии постов, и их
+    версии входят в валидатор. Пока состав страницы неизвестен,
+    она строится сразу, а валидатор считается после нее.
+    """
+    viewer = viewer_state(request)
+    built = None
+    if state is not None and with_comments:
+        comments = page_comments(request)
+        if comments is None:
+            built = build()
+            comments = page_comments(request)
+        # без состава страницы валидатор устарел бы незаметно
+        state = None if comments is None else (state, comments)
+    if state is not None:
+        state = state, viewer
+    response = conditional_response(
+        request, state, modified, build if built is None else lambda: built
+    )
+    if viewer is None and not response.cookies:
+        patch_cache_control(
+            response, public=True, max_age=0,
+            s_maxage=settings.PAGE_CACHE_S_MAXAGE
+        )
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
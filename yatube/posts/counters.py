@@ -0,0 +1,148 @@
+from django.db.models import (Count, DateTimeField, F, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from .models import (Comment, Follow, Group, GroupAuthorStats, GroupStats,
+                     Post, User, UserStats)
+
+
+def shifted(field, delta):
+    """Выражение field + delta, которое не опускается ниже нуля."""
+    return Greatest(F(field) + delta, 0)
+
+
+def change_user_counter(user_id, field, delta):
+    """Атомарно меняет счетчик пользователя на delta.
+
+    Строка статистики создается только при увеличении счетчика:
+    при каскадном удалении пользователя ее уже может не быть.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if not stats.update(**{field: shifted(field, delta)}) and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        stats.update(**{field: shifted(field, delta)})
+
+
+def change_comments_counter(post_id, delta):
+    """Атомарно меняет число комментариев поста на delta."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=shifted('comments_count', delta), updated=Now()
+    )
+
+
+def latest_post_date(group):
+    """Подзапрос с датой новейшего поста группы."""
+    return Subquery(
+        Post.objects.filter(group=group)
+        .order_by('-pub_date')
+        .values('pub_date')[:1]
+    )
+
+
+def change_group_counter(group_id, author_id, delta, pub_date=None):
+    """Атомарно меняет статистику группы и автора в ней на delta.
+
+    Новый пост сдвигает дату последнего поста вперед, после удаления
+    или переноса поста она перечитывается по индексу группы.
+    """
+    if group_id is None:
+        return
+    updates = {'posts_count': shifted('posts_count', delta)}
+    if delta > 0:
+        moment = Value(pub_date, output_field=DateTimeField())
+        # в SQLite GREATEST с NULL дает NULL, в PostgreSQL - moment
+        updates['last_post_date'] = Coalesce(
+            Greatest(F('last_post_date'), moment), moment
+        )
+    else:
+        updates['last_post_date'] = latest_post_date(group_id)
+    # вставка с ignore_conflicts обходится без точек сохранения
+    # get_or_create; увеличение делает повторный UPDATE
+    stats = GroupStats.objects.filter(group_id=group_id)
+    if not stats.update(**updates) and delta > 0:
+        GroupStats.objects.bulk_create(
+            [GroupStats(group_id=group_id)], ignore_conflicts=True
+        )
+        stats.update(**updates)
+    authors = GroupAuthorStats.objects.filter(
+        group_id=group_id, author_id=author_id
+    )
+    updates = {'posts_count': shifted('posts_count', delta)}
+    if not authors.update(**updates) and delta > 0:
+        GroupAuthorStats.objects.bulk_create(
+            [GroupAuthorStats(group_id=group_id, author_id=author_id)],
+            ignore_conflicts=True
+        )
+        authors.update(**updates)
+
+
+def count_by(queryset, field, outer):
+    """Подзапрос с числом строк queryset, где field равно OuterRef(outer)."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef(outer)})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def rebuild_counters(user_ids=None, post_ids=None):
+    """Пересчитывает счетчики по данным таблиц.
+
+    С user_ids и post_ids пересчитываются только эти пользователи
+    и посты - одним запросом на таблицу, а не по запросу на строку.
+    """
+    users = User.objects.all()
+    stats = UserStats.objects.all()
+    posts = Post.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+        stats = stats.filter(user_id__in=user_ids)
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    missing = users.filter(stats__isnull=True).values_list('pk', flat=True)
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing]
+    )
+    stats.update(
+        posts_count=count_by(Post.objects.all(), 'author', 'user'),
+        followers_count=count_by(Follow.objects.all(), 'author', 'user'),
+        following_count=count_by(Follow.objects.all(), 'user', 'user'),
+    )
+    posts.update(
+        comments_count=count_by(Comment.objects.all(), 'post', 'pk'),
+    )
+
+
+def rebuild_group_stats(group_ids=None):
+    """Пересчитывает статистику групп по постам.
+
+    С group_ids пересчитываются только эти группы.
+    """
+    groups = Group.objects.all()
+    stats = GroupStats.objects.all()
+    authors = GroupAuthorStats.objects.all()
+    posts = Post.objects.filter(group__isnull=False)
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+        stats = stats.filter(group_id__in=group_ids)
+        authors = authors.filter(group_id__in=group_ids)
+        posts = posts.filter(group_id__in=group_ids)
+    missing = groups.filter(stats__isnull=True).values_list('pk', flat=True)
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk) for pk in missing]
+    )
+    stats.update(
+        posts_count=count_by(Post.objects.all(), 'group', 'group'),
+        last_post_date=latest_post_date(OuterRef('group')),
+    )
+    authors.delete()
+    totals = posts.order_by().values('group', 'author').annotate(
+        total=Count('pk')
+    ).values_list('group', 'author', 'total')
+    GroupAuthorStats.objects.bulk_create(
+        [GroupAuthorStats(group_id=group_id, author_id=author_id,
+                          posts_count=total)
+         for group_id, author_id, total in totals]
+    )
@@ -0,0 +1,77 @@
+import csv
+import json
+from datetime import datetime
+
+from .models import Comment, Follow, Group, Post
+
+# модель, выгружаемые поля (первым - ключ для пакетов) и поле даты,
+# по которому фильтруется период; порядок - порядок выгрузки
+EXPORTS = {
+    'groups': (Group, ('id', 'title', 'slug', 'description'), None),
+    'posts': (
+        Post,
+        ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image'),
+        'pub_date',
+    ),
+    'comments': (
+        Comment,
+        ('id', 'post_id', 'author_id', 'text', 'created'),
+        'created',
+    ),
+    'follows': (Follow, ('id', 'user_id', 'author_id'), None),
+}
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_rows(name, since=None, until=None, chunk_size=2000):
+    """Строки модели пакетами по первичному ключу.
+
+    Каждый пакет - отдельный запрос pk > последнего выданного,
+    результаты читаются iterator(), поэтому в памяти одновременно
+    лежит не больше chunk_size строк при любом размере таблицы.
+    """
+    model, fields, date_field = EXPORTS[name]
+    queryset = model.objects.order_by('pk')
+    if date_field and since:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    if date_field and until:
+        queryset = queryset.filter(**{f'{date_field}__lt': until})
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(pk__gt=last)
+        count = 0
+        for row in batch.values_list(*fields)[:chunk_size].iterator():
+            yield [export_value(value) for value in row]
+            last = row[0]
+            count += 1
+        if count < chunk_size:
+            return
+
+
+def write_ndjson(stream, name, rows):
+    fields = EXPORTS[name][1]
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(
+            {'model': name, **dict(zip(fields, row))}, ensure_ascii=False
+        ) + '\n')
+        count += 1
+    return count
+
+
+def write_csv(stream, name, rows):
+    writer = csv.writer(stream)
+    writer.writerow(EXPORTS[name][1])
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+WRITERS = {'ndjson': write_ndjson, 'csv': write_csv}
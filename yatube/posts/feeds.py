@@ -0,0 +1,113 @@
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import FeedItem, Follow, Post, UserStats
+
+
+def is_popular(author_id):
+    """Автор, чьи посты не раскладываются по лентам при публикации."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if is_popular(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    FeedItem.objects.bulk_create(
+        [FeedItem(user_id=user_id, post=post,
+                  author_id=post.author_id, pub_date=post.pub_date)
+         for user_id in followers.iterator()],
+        batch_size=500,
+        ignore_conflicts=True
+    )
+
+
+def materialize_feeds(author_id, user_id=None):
+    """Раскладывает все посты автора по лентам его подписчиков.
+
+    Один INSERT ... SELECT без чтения постов в Python; записи,
+    которые уже есть в лентах, пропускаются. С user_id дополняется
+    только лента этого читателя.
+    """
+    quote = connection.ops.quote_name
+    sql = (
+        f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+        f'{quote(FeedItem._meta.db_table)} '
+        f'({quote("user_id")}, {quote("post_id")}, {quote("author_id")}, '
+        f'{quote("pub_date")}) '
+        f'SELECT f.{quote("user_id")}, p.{quote("id")}, '
+        f'p.{quote("author_id")}, p.{quote("pub_date")} '
+        f'FROM {quote(Post._meta.db_table)} p '
+        f'INNER JOIN {quote(Follow._meta.db_table)} f '
+        f'ON f.{quote("author_id")} = p.{quote("author_id")} '
+        f'WHERE p.{quote("author_id")} = %s'
+    )
+    params = [author_id]
+    if user_id is not None:
+        sql += f' AND f.{quote("user_id")} = %s'
+        params.append(user_id)
+    sql += connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def backfill_feed(follow):
+    """Переносит все посты автора в ленту нового подписчика."""
+    if is_popular(follow.author_id):
+        return
+    materialize_feeds(follow.author_id, follow.user_id)
+
+
+def restore_feeds(author_id):
+    """Дополняет ленты, если автор перестал быть популярным.
+
+    Пока автор популярен, его новые посты и подписки на него
+    не попадают в FeedItem. Отписка, после которой у него ровно
+    FEED_FANOUT_LIMIT подписчиков, раскладывает пропущенное.
+    """
+    if UserStats.objects.filter(
+        user_id=author_id, followers_count=settings.FEED_FANOUT_LIMIT
+    ).exists():
+        materialize_feeds(author_id)
+
+
+def prune_feed(follow):
+    """Убирает посты автора из ленты отписавшегося читателя."""
+    FeedItem.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def popular_follows(user):
+    """Популярные авторы, на которых подписан пользователь."""
+    return list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+
+
+def follow_feed(user, popular=None):
+    """Лента подписок пользователя.
+
+    Обычно это срез материализованной ленты FeedItem по индексу
+    (user, pub_date). Если пользователь подписан на популярных
+    авторов, лента собирается из Post, и их посты дочитываются
+    при запросе. popular - уже прочитанный popular_follows(user).
+    """
+    if popular is None:
+        popular = popular_follows(user)
+    if not popular:
+        return FeedItem.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        )
+    return Post.objects.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=popular)
+    ).select_related('author', 'group')
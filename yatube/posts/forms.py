@@ -1,6 +1,11 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
 from django.utils.translation import gettext_lazy as _
+from PIL import Image
 
+from .images import claim_image, normalize_image
 from .models import Comment, Post
 
 
@@ -21,6 +26,41 @@ class PostForm(forms.ModelForm):
             'text': {'max_length': _('Этот пост слишком длинный')},
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not image:
+            self.instance.image_size = None
+            return image
+        if not isinstance(image, UploadedFile):
+            return image
+        if image.size > settings.POST_IMAGE_MAX_BYTES:
+            raise forms.ValidationError(
+                _('Картинка больше %(limit)s'),
+                code='file_too_large',
+                params={
+                    'limit': filesizeformat(settings.POST_IMAGE_MAX_BYTES)
+                },
+            )
+        try:
+            image, self.instance.image_size = normalize_image(image)
+        except (OSError, Image.DecompressionBombError, SyntaxError):
+            # заголовок прошел проверку ImageField, а данные битые
+            raise forms.ValidationError(
+                _('Не удалось прочитать картинку'), code='invalid_image'
+            )
+        self.normalized_image = image
+        return image
+
+    def save(self, commit=True):
+        # такая картинка уже есть: пост сошлется на готовый файл.
+        # Вид сохраняет пост в транзакции, и ссылка держится до коммита
+        image = getattr(self, 'normalized_image', None)
+        name = image and claim_image(image)
+        if name:
+            image.close()
+            self.instance.image = name
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
 
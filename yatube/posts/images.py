@@ -0,0 +1,121 @@
+import hashlib
+import logging
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from PIL import Image, ImageOps
+
+from .models import Post
+from .thumbnails import delete_thumbnails
+
+logger = logging.getLogger(__name__)
+
+# форматы, в которые перекодируются загруженные картинки
+OPAQUE_FORMAT = ('JPEG', 'jpg')
+TRANSPARENT_FORMAT = ('PNG', 'png')
+
+
+def has_transparency(image):
+    return (
+        image.mode in ('RGBA', 'LA')
+        or image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def normalize_image(upload):
+    """Уменьшает картинку, убирает EXIF и перекодирует ее.
+
+    Возвращает файл, названный по хешу содержимого, и его размер
+    в байтах. Pillow декодирует JPEG сразу в уменьшенном масштабе,
+    а результат пишется во временный файл, который уходит на диск,
+    если не влезает в FILE_UPLOAD_MAX_MEMORY_SIZE.
+    """
+    side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    with Image.open(upload) as source:
+        source.thumbnail((side, side))
+        image = ImageOps.exif_transpose(source)
+    if has_transparency(image):
+        image_format, extension = TRANSPARENT_FORMAT
+        image = image.convert('RGBA')
+        options = {'optimize': True}
+    else:
+        image_format, extension = OPAQUE_FORMAT
+        image = image.convert('RGB')
+        options = {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    icc_profile = image.info.get('icc_profile')
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format, **options)
+    size = output.tell()
+    image_file = File(output)
+    image_file.name = f'{file_digest(image_file)}.{extension}'
+    return image_file, size
+
+
+def file_digest(file):
+    """SHA-256 содержимого файла, прочитанного по частям."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def claim_image(image_file):
+    """Имя уже сохраненного файла с тем же содержимым или None.
+
+    UPDATE постов, ссылающихся на файл, держит их блокировку (SQLite -
+    блокировку базы на запись) до конца транзакции. Пост, который
+    в это время перестает ссылаться на файл, ждет ее коммита,
+    и release_image после него уже видит новую ссылку. Файл без
+    ссылок не берется: его как раз может удалять release_image.
+    Вызывается в транзакции, которая сохраняет пост.
+    """
+    name = Post._meta.get_field('image').generate_filename(
+        None, image_file.name
+    )
+    if Post.objects.filter(image=name).update(image=name):
+        return name
+    return None
+
+
+def store_image(image_file):
+    """Сохраняет нормализованную картинку, как форма поста.
+
+    Картинка с тем же содержимым уже может лежать в хранилище -
+    тогда возвращается ее имя. Как и claim_image, вызывается
+    в транзакции, которая сохраняет пост.
+    """
+    name = claim_image(image_file)
+    if name is None:
+        field = Post._meta.get_field('image')
+        name = field.storage.save(
+            field.generate_filename(None, image_file.name), image_file
+        )
+    image_file.close()
+    return name
+
+
+def release_image(name):
+    """Удаляет картинку и ее миниатюры, если на нее не ссылается ни один пост.
+
+    Одинаковые картинки хранятся одним файлом, поэтому число ссылок
+    на него считается по постам, а не хранится отдельно.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    try:
+        delete_thumbnails(name)
+        Post._meta.get_field('image').storage.delete(name)
+    except (OSError, SuspiciousFileOperation):
+        logger.exception('Не удалось удалить картинку %s', name)
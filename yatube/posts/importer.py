@@ -0,0 +1,337 @@
+import csv
+import gzip
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files import File
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_comments_version, bump_feed_version
+from .counters import rebuild_counters, rebuild_group_stats
+from .feeds import fan_out_post
+from .images import normalize_image, release_image, store_image
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .popular import event_score, post_weight, rebuild_popularity
+from .search import get_search_backend
+from .thumbnails import enqueue_thumbnails
+
+# обязательные поля записей каждой модели
+REQUIRED_FIELDS = {
+    'posts': ('text', 'author'),
+    'comments': ('post', 'author', 'text'),
+}
+
+
+class ImportDataError(Exception):
+    pass
+
+
+def open_source(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, encoding='utf-8', newline='')
+
+
+def read_records(file, data_format, model=None):
+    """Записи источника по одной: пары (модель, поля).
+
+    В NDJSON модель указана в поле model каждой строки,
+    CSV содержит записи одной модели.
+    """
+    if data_format == 'csv':
+        for row in csv.DictReader(file):
+            yield model, row
+        return
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop('model', model), record
+
+
+def parse_moment(value, number):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ImportDataError(f'Запись {number}: не дата {value}')
+    if timezone.is_naive(moment):
+        return timezone.make_aware(moment)
+    return moment
+
+
+def insert_rows(model, objects):
+    """Вставляет объекты одним executemany со значениями полей как есть.
+
+    bulk_create вызывает pre_save полей, и auto_now_add заменил бы
+    даты источника текущим временем. Здесь даты передаются явно,
+    а значения по умолчанию объекты уже получили в конструкторе.
+    """
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [
+            [field.get_db_prep_save(getattr(obj, field.attname), connection)
+             for field in fields]
+            for obj in objects
+        ])
+
+
+class LookupCache:
+    """Ключи строк по естественному ключу, недостающие строки создаются.
+
+    Каждое имя ищется в базе один раз за импорт.
+    """
+
+    def __init__(self, model, field, make):
+        self.model = model
+        self.field = field
+        self.make = make
+        self.keys = {}
+
+    def resolve(self, values):
+        missing = {value for value in values if value} - self.keys.keys()
+        if not missing:
+            return
+        self.load(missing)
+        absent = missing - self.keys.keys()
+        if absent:
+            self.model.objects.bulk_create(
+                [self.make(value) for value in sorted(absent)]
+            )
+            self.load(absent)
+
+    def load(self, values):
+        self.keys.update(self.model.objects.filter(
+            **{f'{self.field}__in': values}
+        ).values_list(self.field, 'pk'))
+
+    def __getitem__(self, value):
+        return self.keys[value]
+
+
+class Importer:
+    """Пакетный импорт постов и комментариев.
+
+    Каждая пачка записей пишется одним executemany в своей транзакции,
+    после нее сохраняется контрольная точка. Сигналы при этом
+    не срабатывают, поэтому счетчики, статистика групп, популярность,
+    поисковый индекс и ленты обновляются по пачке целиком: счетчики
+    пересчитываются одним запросом для всех затронутых авторов и постов.
+    Картинки нормализуются параллельно до начала транзакции.
+    """
+
+    def __init__(self, batch_size=1000, workers=4, image_root='',
+                 checkpoint=None, source=''):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.image_root = image_root
+        self.checkpoint = checkpoint
+        self.users = LookupCache(
+            User, 'username',
+            lambda username: User(
+                username=username, password=make_password(None)
+            )
+        )
+        self.groups = LookupCache(
+            Group, 'slug',
+            lambda slug: Group(title=slug, slug=slug, description='')
+        )
+        # посты источника находятся в базе по Post.import_key
+        self.source = source
+        self.done = 0
+        self.counts = Counter()
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as file:
+                self.done = json.load(file)['done']
+
+    def save_checkpoint(self):
+        if not self.checkpoint:
+            return
+        temporary = f'{self.checkpoint}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'done': self.done}, file)
+        os.replace(temporary, self.checkpoint)
+
+    def post_key(self, external_id):
+        return f'{self.source}:{external_id}'
+
+    def find_posts(self, keys):
+        """pk постов по ключам импорта; при повторном импорте - новейшие."""
+        return dict(Post.objects.filter(import_key__in=keys).order_by(
+            'pk'
+        ).values_list('import_key', 'pk'))
+
+    def run(self, records, progress=None):
+        """Импортирует записи, пропуская уже учтенные в контрольной точке.
+
+        Возвращает число импортированных записей в секунду.
+        """
+        records = enumerate(islice(records, self.done, None), self.done + 1)
+        started = time.perf_counter()
+        imported = 0
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            self.done += len(batch)
+            imported += len(batch)
+            self.save_checkpoint()
+            if progress:
+                progress(self.done, imported / (time.perf_counter() - started))
+        elapsed = time.perf_counter() - started
+        return imported / elapsed if elapsed else 0.0
+
+    def import_batch(self, batch):
+        posts, comments = [], []
+        for number, (model, fields) in batch:
+            if model not in REQUIRED_FIELDS:
+                raise ImportDataError(
+                    f'Запись {number}: неизвестная модель {model}'
+                )
+            missing = [name for name in REQUIRED_FIELDS[model]
+                       if not fields.get(name)]
+            if missing:
+                raise ImportDataError(
+                    f'Запись {number}: нет полей {", ".join(missing)}'
+                )
+            target = posts if model == 'posts' else comments
+            target.append((number, fields))
+        images = self.copy_images(posts)
+        stored = {}
+        try:
+            with transaction.atomic():
+                # файлы сохраняются в транзакции: так повторная
+                # картинка надежно ссылается на уже лежащий файл
+                for source, (image, size) in images.items():
+                    stored[source] = store_image(image), size
+                self.users.resolve(
+                    fields['author'] for _, fields in posts + comments
+                )
+                self.groups.resolve(
+                    fields.get('group') for _, fields in posts
+                )
+                self.insert_posts(posts, stored)
+                self.insert_comments(comments)
+                for name, _ in stored.values():
+                    transaction.on_commit(
+                        lambda name=name: enqueue_thumbnails(name)
+                    )
+        except Exception:
+            for name, _ in stored.values():
+                release_image(name)
+            raise
+        finally:
+            for image, _ in images.values():
+                image.close()
+
+    def copy_image(self, source):
+        path = os.path.join(self.image_root, source)
+        try:
+            with open(path, 'rb') as file:
+                return normalize_image(File(file))
+        except OSError as error:
+            raise ImportDataError(f'Картинка {source}: {error}')
+
+    def copy_images(self, posts):
+        sources = sorted({fields['image'] for _, fields in posts
+                          if fields.get('image')})
+        if not sources:
+            return {}
+        with ThreadPoolExecutor(self.workers) as executor:
+            return dict(zip(sources, executor.map(self.copy_image, sources)))
+
+    def insert_posts(self, posts, images):
+        objects = []
+        now = timezone.now()
+        followers = dict(UserStats.objects.filter(
+            user_id__in={self.users[fields['author']] for _, fields in posts}
+        ).values_list('user_id', 'followers_count'))
+        for number, fields in posts:
+            author_id = self.users[fields['author']]
+            pub_date = (parse_moment(fields['pub_date'], number)
+                        if fields.get('pub_date') else now)
+            image_name, image_size = images.get(
+                fields.get('image'), (None, None)
+            )
+            group = fields.get('group')
+            # запись без id ищется по номеру, он не меняется при повторе
+            key = (self.post_key(fields['id']) if fields.get('id')
+                   else f'{self.source}#{number}')
+            objects.append(Post(
+                import_key=key,
+                text=fields['text'],
+                author_id=author_id,
+                group_id=self.groups[group] if group else None,
+                image=image_name,
+                image_size=image_size,
+                pub_date=pub_date,
+                updated=now,
+                # у нового поста нет комментариев, счет - только его вес
+                popularity=event_score(
+                    post_weight(followers.get(author_id, 0)), pub_date
+                ),
+            ))
+        if not objects:
+            return
+        insert_rows(Post, objects)
+        pks = self.find_posts([post.import_key for post in objects])
+        for post in objects:
+            post.pk = pks[post.import_key]
+        rebuild_counters(
+            user_ids={post.author_id for post in objects}, post_ids=()
+        )
+        rebuild_group_stats(
+            group_ids={post.group_id for post in objects} - {None}
+        )
+        get_search_backend().index_many(objects)
+        followed = set(Follow.objects.filter(
+            author_id__in={post.author_id for post in objects}
+        ).values_list('author_id', flat=True).distinct())
+        for post in objects:
+            if post.author_id in followed:
+                fan_out_post(post)
+        bump_feed_version()
+        self.counts['posts'] += len(objects)
+
+    def insert_comments(self, comments):
+        objects = []
+        now = timezone.now()
+        post_ids = self.find_posts(
+            {self.post_key(fields['post']) for _, fields in comments}
+        )
+        for number, fields in comments:
+            post_id = post_ids.get(self.post_key(fields['post']))
+            if post_id is None:
+                self.counts['skipped'] += 1
+                continue
+            objects.append(Comment(
+                post_id=post_id,
+                author_id=self.users[fields['author']],
+                text=fields['text'],
+                created=parse_moment(fields['created'], number)
+                if fields.get('created') else now,
+            ))
+        if not objects:
+            return
+        insert_rows(Comment, objects)
+        commented = {comment.post_id for comment in objects}
+        rebuild_counters(user_ids=(), post_ids=commented)
+        rebuild_popularity(post_ids=commented)
+        Post.objects.filter(pk__in=commented).update(updated=now)
+        # сигналы при вставке не срабатывают, а ленты кэшируют
+        # превью комментариев
+        for post_id in commented:
+            bump_comments_version(post_id)
+        self.counts['comments'] += len(objects)
@@ -0,0 +1,125 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.migrations.loader import MigrationLoader
+from django.db.utils import ConnectionHandler
+
+from posts.models import Follow, User
+
+BEFORE = '0016_feed_item'
+AFTER = '0017_follow_constraints'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запросы к графу подписок до и после уникального '
+        'ограничения и составных индексов Follow на отдельной '
+        'SQLite-базе в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--lookups', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        edges = self.make_edges(random.Random(options['seed']), options)
+        self.stdout.write(
+            f'Граф: {len(edges)} подписок между '
+            f'{options["users"]} пользователями'
+        )
+        results = []
+        for constrained in (False, True):
+            connection = self.open_database(constrained)
+            self.fill(connection, edges, options)
+            results.append(self.measure(
+                connection, edges, random.Random(options['seed']), options
+            ))
+            connection.close()
+        before, after = results
+        self.stdout.write(f'{"запрос":<16}{"до, мкс":>12}{"после, мкс":>12}'
+                          f'{"ускорение":>12}')
+        for name in before:
+            self.stdout.write(
+                f'{name:<16}{before[name]:>12.1f}{after[name]:>12.1f}'
+                f'{before[name] / after[name]:>11.1f}x'
+            )
+
+    def open_database(self, constrained):
+        """SQLite в памяти со схемой Follow до или после миграции."""
+        migration = AFTER if constrained else BEFORE
+        apps = MigrationLoader(None).project_state(('posts', migration)).apps
+        connection = ConnectionHandler({DEFAULT_DB_ALIAS: {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }})[DEFAULT_DB_ALIAS]
+        with connection.schema_editor() as editor:
+            editor.create_model(apps.get_model('auth', 'User'))
+            editor.create_model(apps.get_model('posts', 'Follow'))
+        return connection
+
+    def make_edges(self, rng, options):
+        users = options['users']
+        edges = set()
+        while len(edges) < options['rows']:
+            user, author = rng.randrange(users), rng.randrange(users)
+            if user != author:
+                edges.add((user + 1, author + 1))
+        return list(edges)
+
+    def fill(self, connection, edges, options):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {User._meta.db_table} '
+                '(id, password, last_login, is_superuser, username, '
+                'first_name, last_name, email, is_staff, is_active, '
+                'date_joined) VALUES '
+                "(%s, '', '2023-01-01', 0, %s, '', '', '', 0, 1, "
+                "'2023-01-01')",
+                [(pk, f'user{pk}')
+                 for pk in range(1, options['users'] + 1)]
+            )
+            cursor.executemany(
+                f'INSERT INTO {Follow._meta.db_table} (user_id, author_id) '
+                'VALUES (%s, %s)',
+                edges
+            )
+
+    def compile_shapes(self, connection):
+        """SQL тех же запросов, что выполняют profile и ленты."""
+        querysets = {
+            'profile.exists': Follow.objects.filter(
+                user_id=0, author_id=0).values('pk')[:1],
+            'fan_out': Follow.objects.filter(
+                author_id=0).values_list('user_id'),
+            'follow_feed': Follow.objects.filter(
+                user_id=0).values_list('author_id'),
+        }
+        return {
+            name: queryset.query.get_compiler(
+                connection=connection).as_sql()[0]
+            for name, queryset in querysets.items()
+        }
+
+    def measure(self, connection, edges, rng, options):
+        """Среднее время одного запроса каждого вида в микросекундах."""
+        shapes = self.compile_shapes(connection)
+        samples = [rng.choice(edges) for _ in range(options['lookups'])]
+        params = {
+            'profile.exists': samples,
+            'fan_out': [(author,) for _, author in samples],
+            'follow_feed': [(user,) for user, _ in samples],
+        }
+        result = {}
+        with connection.cursor() as cursor:
+            for name, sql in shapes.items():
+                started = time.perf_counter()
+                for args in params[name]:
+                    cursor.execute(sql, args)
+                    cursor.fetchall()
+                elapsed = time.perf_counter() - started
+                result[name] = elapsed / len(params[name]) * 1_000_000
+        return result
@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from posts.benchmarks import (PARAMETERS, READ_VIEWS, WRITE_VIEWS,
+                              find_regressions, measure, seed_dataset)
+
+BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+# задержки зависят от машины, в общий базовый замер идет только SQL
+TIMINGS = ('p50', 'p95', 'p99', 'rps')
+# от них зависят данные и запросы, поэтому сравнивать можно
+# только замеры с одинаковыми значениями
+DATASET_OPTIONS = (
+    'users', 'groups', 'posts', 'comments', 'follows', 'images',
+    'requests', 'warmup', 'concurrency', 'db_latency', 'seed',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки и число SQL-запросов страниц постов '
+        'на синтетических данных во временной тестовой базе '
+        'и сравнивает их с базовым замером.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Потоков для страниц чтения, запись всегда в один поток.'
+        )
+        parser.add_argument(
+            '--db-latency', type=float, default=0,
+            help='Задержка в мс перед каждым SQL-запросом, как у базы '
+                 'на другой машине.'
+        )
+        parser.add_argument(
+            '--query-threads', type=int,
+            default=settings.CONCURRENT_QUERY_THREADS,
+            help='Потоки для независимых запросов внутри view, '
+                 '0 - по очереди.'
+        )
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--views', nargs='+', choices=READ_VIEWS + WRITE_VIEWS,
+            default=READ_VIEWS + WRITE_VIEWS
+        )
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новый базовый замер.'
+        )
+        parser.add_argument(
+            '--timing', action='store_true',
+            help='Сохранять и сравнивать и задержки. Такой базовый '
+                 'замер годится только для той же машины.'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.5,
+            help='Допустимый рост p95 относительно базового замера '
+                 'при --timing.'
+        )
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, DEBUG=False,
+                CONCURRENT_QUERY_THREADS=options['query_threads']
+            ):
+                results = self.run(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        self.report(results)
+        parameters = {name: options[name] for name in DATASET_OPTIONS}
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            baseline = {
+                view: {name: round(value, 2)
+                       for name, value in result.items()
+                       if options['timing'] or name not in TIMINGS}
+                for view, result in results.items()
+            }
+            baseline[PARAMETERS] = parameters
+            with open(options['baseline'], 'w') as file:
+                json.dump(baseline, file, indent=2, sort_keys=True)
+            self.stdout.write(f'Базовый замер записан в {options["baseline"]}')
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as file:
+            baseline = json.load(file)
+        if baseline.get(PARAMETERS) != parameters:
+            raise CommandError(
+                'Базовый замер снят с другими параметрами: '
+                f'{baseline.get(PARAMETERS)}'
+            )
+        tolerance = None
+        if options['timing']:
+            timed = [view for view in results
+                     if 'p95' in baseline.get(view, {})]
+            if not timed:
+                raise CommandError(
+                    'В базовом замере нет задержек: снимите его на этой '
+                    'машине с --save-baseline --timing'
+                )
+            tolerance = options['tolerance']
+        regressions = find_regressions(results, baseline, tolerance)
+        if regressions:
+            raise CommandError(
+                'Регрессия относительно базового замера:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        cache.clear()
+        dataset = seed_dataset(
+            rng,
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            images=options['images'],
+        )
+        client = Client()
+        client.force_login(dataset.reader)
+        session_key = client.cookies[settings.SESSION_COOKIE_NAME].value
+        results = {}
+        for view in options['views']:
+            concurrency = (
+                options['concurrency'] if view in READ_VIEWS else 1
+            )
+            results[view] = measure(
+                view, dataset, session_key, rng,
+                requests=options['requests'], concurrency=concurrency,
+                warmup=options['warmup'], db_latency=options['db_latency']
+            )
+        return results
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"страница":<16}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"запр/с":>10}{"SQL":>8}'
+        )
+        for view, result in results.items():
+            self.stdout.write(
+                f'{view:<16}{result["p50"]:>10.1f}{result["p95"]:>10.1f}'
+                f'{result["p99"]:>10.1f}{result["rps"]:>10.1f}'
+                f'{result["queries"]:>8.1f}'
+            )
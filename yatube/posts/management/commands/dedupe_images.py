@@ -0,0 +1,53 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Now
+
+from posts.cache import bump_feed_version
+from posts.images import file_digest
+from posts.models import Post
+from posts.thumbnails import delete_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки постов по хешу содержимого, '
+        'переводит посты на общий файл и удаляет копии.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        _, filenames = storage.listdir(directory)
+        renamed = removed = 0
+        for filename in sorted(filenames):
+            name = f'{directory}/{filename}'
+            with storage.open(name) as file:
+                digest = file_digest(file)
+            extension = os.path.splitext(filename)[1].lower()
+            target = f'{directory}/{digest}{extension}'
+            if target == name:
+                continue
+            if storage.exists(target):
+                removed += 1
+            else:
+                renamed += 1
+                if not options['dry_run']:
+                    with storage.open(name) as file:
+                        storage.save(target, file)
+            if options['dry_run']:
+                continue
+            Post.objects.filter(image=name).update(
+                image=target, updated=Now()
+            )
+            delete_thumbnails(name)
+            storage.delete(name)
+        if (renamed or removed) and not options['dry_run']:
+            bump_feed_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Переименовано: {renamed}, удалено копий: {removed}'
+        ))
@@ -0,0 +1,89 @@
+import gzip
+import os
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import is_naive, make_aware
+
+from posts.export import EXPORTS, WRITERS, iter_rows
+
+
+def parse_moment(value):
+    """Дата или дата со временем из ISO-строки, в текущем часовом поясе."""
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Не дата: {value}')
+        moment = datetime.combine(date, time.min)
+    return make_aware(moment) if is_naive(moment) else moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии и подписки '
+        'в NDJSON или CSV, не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='model',
+            help=f'Что выгружать: {", ".join(EXPORTS)}; по умолчанию все.'
+        )
+        parser.add_argument(
+            '--format', choices=list(WRITERS), default='ndjson'
+        )
+        parser.add_argument(
+            '--output',
+            help='Каталог для файлов <модель>.<формат>, '
+                 'без него выгрузка идет в stdout.'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true',
+            help='Сжимать файлы на лету, нужен --output.'
+        )
+        parser.add_argument(
+            '--since', type=parse_moment,
+            help='Посты и комментарии не раньше даты.'
+        )
+        parser.add_argument(
+            '--until', type=parse_moment,
+            help='Посты и комментарии раньше даты.'
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        unknown = set(options['models']) - set(EXPORTS)
+        if unknown:
+            raise CommandError(f'Неизвестные модели: {", ".join(unknown)}')
+        models = [name for name in EXPORTS
+                  if name in options['models'] or not options['models']]
+        output = options['output']
+        if options['gzip'] and not output:
+            raise CommandError('Для --gzip нужен --output.')
+        if options['format'] == 'csv' and not output and len(models) > 1:
+            raise CommandError(
+                'CSV в stdout выгружается только для одной модели.'
+            )
+        write = WRITERS[options['format']]
+        if output:
+            os.makedirs(output, exist_ok=True)
+        for name in models:
+            rows = iter_rows(
+                name, since=options['since'], until=options['until'],
+                chunk_size=options['chunk_size']
+            )
+            if not output:
+                count = write(self.stdout, name, rows)
+            else:
+                path = os.path.join(output, f'{name}.{options["format"]}')
+                if options['gzip']:
+                    path += '.gz'
+                    stream = gzip.open(path, 'wt', encoding='utf-8',
+                                       newline='')
+                else:
+                    stream = open(path, 'w', encoding='utf-8', newline='')
+                with stream:
+                    count = write(stream, name, rows)
+            self.stderr.write(f'{name}: {count}', self.style.SUCCESS)
@@ -0,0 +1,79 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import (REQUIRED_FIELDS, Importer, ImportDataError,
+                            open_source, read_records)
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты и комментарии из NDJSON или CSV '
+        'пакетами bulk_create с контрольной точкой для продолжения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source', help='Файл NDJSON или CSV, можно сжатый gzip.'
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='По умолчанию определяется по расширению файла.'
+        )
+        parser.add_argument(
+            '--model', choices=list(REQUIRED_FIELDS), default='posts',
+            help='Модель записей CSV.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Потоков для копирования картинок.'
+        )
+        parser.add_argument(
+            '--images',
+            help='Каталог, от которого считаются пути картинок, '
+                 'по умолчанию каталог источника.'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: если он есть, импорт '
+                 'продолжается с первой неучтенной записи.'
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        name = source[:-3] if source.endswith('.gz') else source
+        data_format = options['format'] or (
+            'csv' if name.endswith('.csv') else 'ndjson'
+        )
+        importer = Importer(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            image_root=options['images'] or os.path.dirname(source),
+            checkpoint=options['checkpoint'],
+            source=os.path.basename(name),
+        )
+        if importer.done:
+            self.stderr.write(
+                f'Продолжение с записи {importer.done + 1}',
+                self.style.WARNING
+            )
+        try:
+            with open_source(source) as file:
+                rate = importer.run(
+                    read_records(file, data_format, options['model']),
+                    progress=self.progress
+                )
+        except (OSError, ValueError, ImportDataError) as error:
+            raise CommandError(error)
+        counts = importer.counts
+        self.stdout.write(self.style.SUCCESS(
+            f'Постов: {counts["posts"]}, комментариев: {counts["comments"]}, '
+            f'пропущено комментариев: {counts["skipped"]}, '
+            f'{rate:.0f} записей/с'
+        ))
+
+    def progress(self, done, rate):
+        self.stderr.write(
+            f'{done} записей, {rate:.0f} записей/с', self.style.SUCCESS
+        )
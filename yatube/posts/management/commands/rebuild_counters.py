@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild_counters, rebuild_group_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики постов, подписок, комментариев '
+            'и статистику групп.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_counters()
+            rebuild_group_stats()
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
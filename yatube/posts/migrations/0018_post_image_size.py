@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:24
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def fill_image_sizes(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.exclude(image='').exclude(image__isnull=True)
+    for post in posts.only('image').iterator():
+        try:
+            size = default_storage.size(post.image.name)
+        except (OSError, SuspiciousFileOperation):
+            continue
+        Post.objects.filter(pk=post.pk).update(image_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_follow_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_size',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Размер картинки, байт'),
+        ),
+        migrations.RunPython(fill_image_sizes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorStats = apps.get_model('posts', 'GroupAuthorStats')
+    group_posts = Post.objects.filter(group=OuterRef('group')).order_by()
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=pk)
+         for pk in Group.objects.values_list('pk', flat=True)]
+    )
+    GroupStats.objects.update(
+        posts_count=Coalesce(Subquery(
+            group_posts.values('group').annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0),
+        last_post_date=Subquery(
+            group_posts.order_by('-pub_date').values('pub_date')[:1]
+        ),
+    )
+    GroupAuthorStats.objects.bulk_create(
+        [GroupAuthorStats(group_id=group_id, author_id=author_id,
+                          posts_count=total)
+         for group_id, author_id, total in Post.objects.filter(
+             group__isnull=False
+         ).order_by().values('group', 'author').annotate(
+             total=Count('pk')
+         ).values_list('group', 'author', 'total')]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0021_post_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('last_post_date', models.DateTimeField(blank=True, null=True, verbose_name='Последний пост')),
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Статистика группы',
+                'verbose_name_plural': 'Статистика групп',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_stats', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора в группе',
+                'verbose_name_plural': 'Статистика авторов в группах',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='groupstats',
+            index=models.Index(fields=['-posts_count', 'group'], name='group_stats_posts_count_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupauthorstats',
+            index=models.Index(fields=['group', '-posts_count', 'author'], name='group_author_stats_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthorstats',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='group_author_stats_unique'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
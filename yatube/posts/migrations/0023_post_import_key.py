@@ -0,0 +1,22 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_group_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='import_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255, verbose_name='Ключ записи импорта'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['import_key'], name='post_import_key_idx'),
+        ),
+    ]
@@ -19,6 +19,18 @@ class Follow(models.Model):
         verbose_name='Автор'
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='follow_unique_user_author'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='follow_not_self'),
+        )
+        indexes = (
+            models.Index(fields=('author', 'user'),
+                         name='follow_author_user_idx'),
+        )
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -38,6 +50,11 @@ class Post(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    # правки и комментарии двигают дату, она входит в валидаторы лент
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -59,9 +76,49 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    image_size = models.PositiveIntegerField(
+        'Размер картинки, байт',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность',
+        default=0,
+        editable=False
+    )
+    import_key = models.CharField(
+        'Ключ записи импорта',
+        max_length=255,
+        blank=True,
+        default='',
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('image',), name='post_image_idx'),
+            models.Index(fields=('-popularity', '-id'),
+                         name='post_popularity_idx'),
+            models.Index(fields=('import_key',),
+                         name='post_import_key_idx'),
+            models.Index(fields=('group', 'updated'),
+                         name='post_group_updated_idx'),
+            models.Index(fields=('author', 'updated'),
+                         name='post_author_updated_idx'),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -93,5 +150,124 @@ class Comment(models.Model):
         auto_now_add=True
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('post', 'created', 'id'),
+                         name='comment_post_created_idx'),
+        )
+
     def __str__(self):
         return self.text[:15]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count}'
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Группа'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    last_post_date = models.DateTimeField(
+        'Последний пост',
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('-posts_count', 'group'),
+                         name='group_stats_posts_count_idx'),
+        )
+        verbose_name = 'Статистика группы'
+        verbose_name_plural = 'Статистика групп'
+
+    def __str__(self):
+        return f'{self.group}: {self.posts_count}'
+
+
+class GroupAuthorStats(models.Model):
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_stats',
+        verbose_name='Группа'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('group', 'author'),
+                                    name='group_author_stats_unique'),
+        )
+        indexes = (
+            models.Index(fields=('group', '-posts_count', 'author'),
+                         name='group_author_stats_top_idx'),
+        )
+        verbose_name = 'Статистика автора в группе'
+        verbose_name_plural = 'Статистика авторов в группах'
+
+    def __str__(self):
+        return f'{self.group} / {self.author}: {self.posts_count}'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post')
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='feed_item_unique_user_post'),
+        )
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='feed_item_user_pub_date_idx'),
+            models.Index(fields=('user', 'author'),
+                         name='feed_item_user_author_idx'),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
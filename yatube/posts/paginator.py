@@ -0,0 +1,108 @@
+import base64
+import binascii
+
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(obj, field, tiebreak='pk'):
+    """Кодирует позицию объекта (дата, id) в строку для URL."""
+    value = getattr(obj, field).isoformat()
+    raw = f'{value}|{getattr(obj, tiebreak)}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает пару (дата, id) или None для битого курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.split('|')
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+class InvalidCursor(InvalidPage):
+    """Курсор страницы не разбирается."""
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (дата, id) без COUNT и OFFSET.
+
+    Нумерованные страницы (?page=N) по-прежнему обслуживает
+    базовый Paginator, чтобы старые ссылки продолжали работать.
+    """
+
+    def __init__(self, object_list, per_page, key='-pub_date',
+                 tiebreak='pk', **kwargs):
+        self.descending = key.startswith('-')
+        self.field = key.lstrip('-')
+        self.tiebreak = tiebreak
+        # один порядок для курсоров и для ?page=N, иначе OFFSET
+        # по неупорядоченной выборке повторяет и теряет записи
+        sign = '-' if self.descending else ''
+        super().__init__(
+            object_list.order_by(f'{sign}{self.field}',
+                                 f'{sign}{self.tiebreak}'),
+            per_page, **kwargs
+        )
+
+    def _after(self, value, pk, forward):
+        lookup = 'lt' if forward == self.descending else 'gt'
+        return (
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'{self.tiebreak}__{lookup}': pk})
+        )
+
+    def get_cursor_page(self, after=None, before=None):
+        """Читает одну страницу после или перед курсором.
+
+        Запрашивается на одну запись больше размера страницы:
+        по ней определяется, есть ли следующая страница. Битый
+        курсор поднимает InvalidCursor.
+        """
+        queryset = self.object_list
+        cursor = before or after
+        position = decode_cursor(cursor) if cursor else None
+        if cursor and position is None:
+            raise InvalidCursor('Неверный курсор страницы')
+        backwards = position is not None and bool(before)
+        if position is not None:
+            queryset = queryset.filter(
+                self._after(*position, forward=not backwards)
+            )
+            if backwards:
+                queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        # номер страницы считается от курсора: 1 - первая, 2 - любая
+        # после нее. count согласован с курсорами, поэтому has_next,
+        # next_page_number и другие методы Page не делают COUNT
+        number = 2 if has_previous else 1
+        self.count = (
+            number * self.per_page + 1 if has_next
+            else (number - 1) * self.per_page + len(rows)
+        )
+        page = Page(rows, number, self)
+        page.is_cursor = True
+        page.next_cursor = (
+            encode_cursor(rows[-1], self.field, self.tiebreak)
+            if rows and has_next else None
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], self.field, self.tiebreak)
+            if rows and has_previous else None
+        )
+        return page
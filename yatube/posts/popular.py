@@ -0,0 +1,133 @@
+import bisect
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+
+from .models import Comment, Post, UserStats
+
+POPULAR_KEY = 'posts:popular'
+
+
+def event_score(weight, moment):
+    """Вклад события в популярность поста, в логарифмической шкале.
+
+    Вес события убывает вдвое за POPULAR_HALF_LIFE секунд. Сравнивать
+    текущие веса постов - все равно что сравнивать log(вес) + t / tau
+    на момент событий, поэтому счет не пересчитывается со временем,
+    а лишь растет с новыми событиями.
+    """
+    decay = settings.POPULAR_HALF_LIFE / math.log(2)
+    return math.log(weight) + moment.timestamp() / decay
+
+
+def post_weight(followers_count):
+    """Вес публикации: у автора с подписчиками пост заметнее."""
+    return 1 + settings.POPULAR_FOLLOWER_WEIGHT * math.log1p(followers_count)
+
+
+def combine(first, second):
+    """log(e^first + e^second) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def initial_popularity(author_id, moment):
+    followers = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    return event_score(post_weight(followers or 0), moment)
+
+
+def add_event(post_id, weight, moment, **updates):
+    """Атомарно добавляет событие к популярности поста.
+
+    updates - другие поля поста, которые меняются тем же UPDATE.
+    Возвращает новый счет или None, если поста уже нет.
+    """
+    score = Value(event_score(weight, moment), output_field=FloatField())
+    # log(e^a + e^b) = max(a, b) + log(1 + e^-|a - b|)
+    Post.objects.filter(pk=post_id).update(popularity=(
+        Greatest(F('popularity'), score)
+        + Ln(1 + Exp(-Abs(F('popularity') - score)))
+    ), **updates)
+    return Post.objects.filter(pk=post_id).values_list(
+        'popularity', flat=True
+    ).first()
+
+
+def get_ranking():
+    """Первые POPULAR_SIZE постов как список (счет, id) по убыванию.
+
+    Список хранится в кэше и правится на месте при новых событиях.
+    Обновления из разных процессов могут теряться, поэтому через
+    POPULAR_TTL он перечитывается одним запросом по индексу.
+    """
+    ranking = cache.get(POPULAR_KEY)
+    if ranking is None:
+        ranking = list(Post.objects.order_by(
+            '-popularity', '-pk'
+        ).values_list('popularity', 'pk')[:settings.POPULAR_SIZE])
+        cache.set(POPULAR_KEY, ranking, settings.POPULAR_TTL)
+    return ranking
+
+
+def update_ranking(post_id, score):
+    """Ставит пост в закэшированный рейтинг по новому счету."""
+    ranking = cache.get(POPULAR_KEY)
+    if ranking is None:
+        return
+    ranking = [entry for entry in ranking if entry[1] != post_id]
+    if score is not None:
+        # ключи убывают, поэтому бинарный поиск идет по (-счет, -id)
+        keys = [(-value, -pk) for value, pk in ranking]
+        position = bisect.bisect_left(keys, (-score, -post_id))
+        if position < settings.POPULAR_SIZE:
+            ranking.insert(position, (score, post_id))
+            del ranking[settings.POPULAR_SIZE:]
+    cache.set(POPULAR_KEY, ranking, settings.POPULAR_TTL)
+
+
+def rebuild_popularity(post_ids=None, post_model=Post,
+                       comment_model=Comment, chunk_size=2000):
+    """Пересчитывает популярность постов по комментариям.
+
+    Нужен после вставок в обход сигналов. С post_ids пересчитываются
+    только эти посты. Модели передаются явно для миграции.
+    """
+    quote = connection.ops.quote_name
+    update = (
+        f'UPDATE {quote(post_model._meta.db_table)} '
+        f'SET {quote("popularity")} = %s WHERE {quote("id")} = %s'
+    )
+    posts = post_model.objects.order_by('pk')
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    last = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last).values_list(
+            'pk', 'pub_date', 'author__stats__followers_count'
+        )[:chunk_size])
+        if not batch:
+            break
+        last = batch[-1][0]
+        scores = {
+            pk: event_score(post_weight(followers or 0), pub_date)
+            for pk, pub_date, followers in batch
+        }
+        comments = comment_model.objects.filter(
+            post_id__in=scores
+        ).values_list('post_id', 'created')
+        for post_id, created in comments.iterator():
+            scores[post_id] = combine(scores[post_id], event_score(
+                settings.POPULAR_COMMENT_WEIGHT, created
+            ))
+        # executemany одного UPDATE по ключу быстрее bulk_update с CASE
+        with connection.cursor() as cursor:
+            cursor.executemany(update, [
+                (score, pk) for pk, score in scores.items()
+            ])
+    cache.delete(POPULAR_KEY)
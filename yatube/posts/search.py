@@ -0,0 +1,159 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+# полнотекстовая таблица создается миграцией только в SQLite
+VENDOR_BACKENDS = {'sqlite': 'posts.search.FTS5SearchBackend'}
+DEFAULT_BACKEND = 'posts.search.SimpleSearchBackend'
+
+
+class SearchResults:
+    """Ленивая выдача поиска для Paginator.
+
+    len() считает совпадения, срез читает из индекса только id одной
+    страницы и загружает посты в порядке релевантности.
+    """
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.query = query
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.backend.count(self.query)
+        return self._count
+
+    def __getitem__(self, page):
+        ids = self.backend.ranked_ids(
+            self.query, page.start, page.stop - page.start
+        )
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class SimpleSearchBackend:
+    """Поиск через icontains для баз без полнотекстового индекса.
+
+    Совпадения упорядочены по дате, а не по релевантности.
+    """
+
+    def index(self, post):
+        pass
+
+    def index_many(self, posts):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def matches(self, query):
+        queryset = Post.objects.all()
+        for word in WORD_RE.findall(query):
+            queryset = queryset.filter(text__icontains=word)
+        return queryset.values_list('pk', flat=True)
+
+    def count(self, query):
+        return len(self.matches(query)[:settings.SEARCH_MAX_RESULTS])
+
+    def ranked_ids(self, query, offset, limit):
+        ids = self.matches(query)[:settings.SEARCH_MAX_RESULTS]
+        return list(ids[offset:offset + limit])
+
+
+class FTS5SearchBackend:
+    """Инвертированный индекс SQLite FTS5, rowid в нем равен id поста.
+
+    Все совпадения ранжируются по bm25 внутри запроса FTS5, а выдача
+    ограничена SEARCH_MAX_RESULTS лучшими из них: ORDER BY rank
+    с LIMIT не сортирует совпадения целиком.
+    """
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def index_many(self, posts):
+        """Индексирует новые посты одним executemany."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [(post.pk, post.text) for post in posts]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+
+    @staticmethod
+    def match_expression(query):
+        # слова берутся в кавычки, чтобы операторы FTS5 из запроса
+        # не выполнялись; префиксный поиск на больших таблицах
+        # в разы медленнее, поэтому совпадение точное
+        return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+    def count(self, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s LIMIT %s)',
+                [expression, settings.SEARCH_MAX_RESULTS]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        expression = self.match_expression(query)
+        limit = min(limit, settings.SEARCH_MAX_RESULTS - offset)
+        if not expression or limit <= 0:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [expression, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def get_search_backend():
+    path = settings.SEARCH_BACKEND or VENDOR_BACKENDS.get(
+        connection.vendor, DEFAULT_BACKEND
+    )
+    return import_string(path)()
+
+
+def search_posts(query):
+    """Посты по запросу, отсортированные по релевантности."""
+    return SearchResults(get_search_backend(), query)
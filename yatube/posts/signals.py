@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import DEFERRED
+from django.db.models.functions import Now
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_comments_version, bump_feed_version
+from .counters import (change_comments_counter, change_group_counter,
+                       change_user_counter, shifted)
+from .feeds import backfill_feed, fan_out_post, prune_feed, restore_feeds
+from .images import release_image
+from .models import Comment, Follow, Group, GroupStats, Post, User, UserStats
+from .popular import add_event, initial_popularity, update_ranking
+from .search import get_search_backend
+from .thumbnails import enqueue_thumbnails
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_save, sender=Post)
+def score_new_post(sender, instance, **kwargs):
+    if instance._state.adding and not instance.popularity:
+        instance.popularity = initial_popularity(
+            instance.author_id, instance.pub_date or timezone.now()
+        )
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+def remember_post(instance):
+    image = instance.__dict__.get('image', DEFERRED)
+    instance._previous_image = getattr(image, 'name', image)
+    instance._previous_group = instance.__dict__.get('group_id', DEFERRED)
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded_post(sender, instance, **kwargs):
+    # картинка и группа, с которыми пост пришел из базы
+    remember_post(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_post(sender, instance, **kwargs):
+    """Прежние картинка и группа поста для сигнала post_save.
+
+    Обычно они запомнены при загрузке поста, и в базу за ними
+    ходить не нужно. Запрос нужен только посту, загруженному
+    без этих полей через only() или defer().
+    """
+    if instance._state.adding:
+        instance._previous_image = instance._previous_group = None
+    elif DEFERRED in (instance._previous_image, instance._previous_group):
+        instance._previous_image, instance._previous_group = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'image', 'group_id'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    bump_feed_version()
+    get_search_backend().index(instance)
+    if created:
+        change_user_counter(instance.author_id, 'posts_count', 1)
+        fan_out_post(instance)
+        update_ranking(instance.pk, instance.popularity)
+        change_group_counter(
+            instance.group_id, instance.author_id, 1, instance.pub_date
+        )
+    elif getattr(instance, '_previous_group',
+                 instance.group_id) != instance.group_id:
+        change_group_counter(
+            instance._previous_group, instance.author_id, -1
+        )
+        change_group_counter(
+            instance.group_id, instance.author_id, 1, instance.pub_date
+        )
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: enqueue_thumbnails(name))
+    previous = getattr(instance, '_previous_image', None)
+    if previous and previous != instance.image.name:
+        transaction.on_commit(lambda: release_image(previous))
+    remember_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_feed_version()
+    get_search_backend().remove(instance.pk)
+    change_user_counter(instance.author_id, 'posts_count', -1)
+    update_ranking(instance.pk, None)
+    change_group_counter(instance.group_id, instance.author_id, -1)
+    if instance.image:
+        name = instance.image.name
+        transaction.on_commit(lambda: release_image(name))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    # ленты показывают последние комментарии постов
+    bump_comments_version(instance.post_id)
+    if created and instance.post_id:
+        # счетчик комментариев меняется тем же UPDATE, что и счет
+        update_ranking(instance.post_id, add_event(
+            instance.post_id, settings.POPULAR_COMMENT_WEIGHT,
+            instance.created, comments_count=shifted('comments_count', 1),
+            updated=Now()
+        ))
+    elif instance.post_id:
+        # правка комментария меняет превью в лентах
+        Post.objects.filter(pk=instance.post_id).update(updated=Now())
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump_comments_version(instance.post_id)
+    if instance.post_id:
+        change_comments_counter(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_user_counter(instance.author_id, 'followers_count', 1)
+        change_user_counter(instance.user_id, 'following_count', 1)
+        backfill_feed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_user_counter(instance.author_id, 'followers_count', -1)
+    change_user_counter(instance.user_id, 'following_count', -1)
+    prune_feed(instance)
+    restore_feeds(instance.author_id)
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page, size=5):
+    """Номера страниц не дальше size от текущей.
+
+    Перебирать весь page_range в шаблоне - по проходу на страницу,
+    а у каталога групп их сотни.
+    """
+    first = max(page.number - size, 1)
+    last = min(page.number + size, page.paginator.num_pages)
+    return range(first, last + 1)
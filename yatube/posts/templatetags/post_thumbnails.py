@@ -0,0 +1,25 @@
+from django import template
+
+from ..thumbnails import (Thumbnail, enqueue_thumbnails,
+                          get_ready_thumbnails, thumbnail_name)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(image, geometry):
+    """Миниатюра картинки поста или оригинал, пока миниатюра готовится.
+
+    Готовность проверяется по кэшу, без обращения к хранилищу.
+    Для битой картинки тег ничего не возвращает.
+    """
+    if not image:
+        return None
+    ready = get_ready_thumbnails(image.name)
+    if ready is None:
+        enqueue_thumbnails(image.name)
+        # без фоновых потоков миниатюры уже созданы
+        ready = get_ready_thumbnails(image.name)
+    if ready is None:
+        return image
+    return Thumbnail(thumbnail_name(image.name, geometry)) if ready else None
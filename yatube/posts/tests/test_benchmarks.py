@@ -0,0 +1,46 @@
+import random
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.conf import settings
+
+from ..benchmarks import (READ_VIEWS, WRITE_VIEWS, find_regressions, measure,
+                          percentile, seed_dataset)
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarksTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_measure_views(self):
+        """Замер каждой страницы дает задержки и число SQL-запросов."""
+        rng = random.Random(1)
+        dataset = seed_dataset(rng, users=5, groups=2, posts=30,
+                               comments=30, follows=10, images=1)
+        self.client.force_login(dataset.reader)
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        for view in READ_VIEWS + WRITE_VIEWS:
+            with self.subTest(view=view):
+                result = measure(view, dataset, session_key, rng, requests=3)
+                self.assertLessEqual(result['p50'], result['p99'])
+                self.assertGreater(result['queries'], 0)
+
+    def test_find_regressions(self):
+        """Регрессия - лишний SQL-запрос, а при допуске - и рост p95."""
+        baseline = {'index': {'p95': 10.0, 'queries': 2.0}}
+        self.assertEqual(find_regressions(
+            {'index': {'p95': 14.0, 'queries': 2.0}}, baseline, 0.5
+        ), [])
+        self.assertEqual(len(find_regressions(
+            {'index': {'p95': 16.0, 'queries': 3.0}}, baseline, 0.5
+        )), 2)
+        self.assertEqual(len(find_regressions(
+            {'index': {'p95': 16.0, 'queries': 3.0}}, baseline
+        )), 1)
+        self.assertEqual(percentile([3, 1, 2, 4], 50), 2)
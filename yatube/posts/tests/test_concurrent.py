@@ -0,0 +1,44 @@
+import threading
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from core.query_budget import record_queries
+
+from ..concurrent import run_concurrently
+from ..models import User
+
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+
+
+class RunConcurrentlyTest(TransactionTestCase):
+    def setUp(self):
+        User.objects.create_user(username=USER_USERNAME)
+
+    def read(self):
+        return threading.get_ident(), User.objects.count()
+
+    def test_reads_in_pool_threads(self):
+        """Чтения идут в разных потоках, результаты - в порядке вызовов."""
+        with record_queries() as queries:
+            results = run_concurrently(self.read, self.read, lambda: 'ok')
+        self.assertEqual(results[2], 'ok')
+        self.assertEqual([count for _, count in results[:2]], [1, 1])
+        self.assertEqual(results[0][0], threading.get_ident())
+        self.assertNotEqual(results[1][0], threading.get_ident())
+        # запросы потоков пула видны обертке вызывающего потока
+        self.assertEqual(len(queries), 2)
+
+    def test_sequential_inside_transaction(self):
+        """Внутри atomic() другие соединения не видят новых строк."""
+        with transaction.atomic():
+            User.objects.create_user(username=USER_USERNAME1)
+            results = run_concurrently(self.read, self.read)
+        self.assertEqual(results, [(threading.get_ident(), 2)] * 2)
+
+    def test_errors_propagate(self):
+        with self.assertRaises(User.DoesNotExist):
+            run_concurrently(
+                self.read, lambda: User.objects.get(username='nobody')
+            )
@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.conf import settings
+
+from ..cache import FEED_VERSION_KEY, get_feed_version
+from ..models import Comment, Group, Post, User
+
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тест описание'
+USER_USERNAME = 'Anonimus'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+@override_settings(SHARED_CACHE=True)
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION
+        )
+        cls.post = Post.objects.create(
+            text=POST_TEXT, author=cls.user, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(GROUP_SLUG,)),
+            reverse('posts:profile', args=(USER_USERNAME,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_not_modified_without_render(self):
+        """Неизменившаяся страница отдается 304 без рендеринга шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_changes_invalidate(self):
+        """Правка поста и новый комментарий меняют валидатор."""
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Исправленная запись'
+        self.post.save()
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_invalidates_only_its_pages(self):
+        """Комментарий меняет валидаторы только страниц со своим постом."""
+        other = Group.objects.create(title='Другая', slug='other')
+        Post.objects.create(text=POST_TEXT, author=self.user, group=other)
+        other_url = reverse('posts:group_list', args=(other.slug,))
+        etags = {url: self.client.get(url)['ETag']
+                 for url in (*self.urls, other_url)}
+        version = get_feed_version()
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        self.assertEqual(get_feed_version(), version)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, 304 if url == other_url else 200
+                )
+
+    @override_settings(SHARED_CACHE=False)
+    def test_changes_in_other_workers_invalidate(self):
+        """Без общего кэша правку и удаление видно по постам в базе."""
+        older = Post.objects.create(
+            text=POST_TEXT, author=self.user, group=self.group
+        )
+        Post.objects.filter(pk=older.pk).update(
+            pub_date=self.post.pub_date.replace(year=2000)
+        )
+        version = get_feed_version()
+
+        def change(urls, action):
+            etags = {url: self.client.get(url)['ETag'] for url in urls}
+            action()
+            # кэш этого воркера не видел правок другого
+            cache.set(FEED_VERSION_KEY, version, None)
+            for url, etag in etags.items():
+                with self.subTest(url=url):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code, 200)
+
+        change(self.urls[1:3], older.delete)
+        self.post.text = 'Исправленная запись'
+        change(self.urls[1:], self.post.save)
+
+    def test_cache_control(self):
+        """Страницы анонимов кэширует прокси, пользователей - браузер."""
+        url = reverse('posts:profile', args=(USER_USERNAME,))
+        anonymous = self.client.get(url)
+        self.assertIn('public', anonymous['Cache-Control'])
+        self.assertIn(
+            f's-maxage={settings.PAGE_CACHE_S_MAXAGE}',
+            anonymous['Cache-Control']
+        )
+        response = self.authorized_client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+        response = self.authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=anonymous['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_no_validators_without_shared_cache(self):
+        """Без общего кэша страницы без запроса даты идут без ETag."""
+        for url in (reverse('posts:index'), reverse('posts:group_index')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,55 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post, User
+
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.author = User.objects.create_user(username=USER_USERNAME1)
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def test_counters_follow_views(self):
+        """Счетчики меняются вместе с постами, комментариями и подписками."""
+        post = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Комментарий'}
+        )
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    kwargs={'username': self.author.username})
+        )
+        post.refresh_from_db()
+        self.author.stats.refresh_from_db()
+        self.user.stats.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.user.stats.following_count, 1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    kwargs={'username': self.author.username})
+        )
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 0)
+
+    def test_rebuild_counters(self):
+        """Команда rebuild_counters исправляет разошедшиеся счетчики."""
+        Post.objects.bulk_create(
+            [Post(text=POST_TEXT, author=self.author) for _ in range(3)]
+        )
+        call_command('rebuild_counters', stdout=StringIO())
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 3)
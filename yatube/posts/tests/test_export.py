@@ -0,0 +1,79 @@
+import csv
+import gzip
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Group, Post, User, Follow
+
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тест описание'
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.author = User.objects.create_user(username=USER_USERNAME1)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION
+        )
+        Post.objects.bulk_create([
+            Post(text=f'{POST_TEXT} {i}', author=cls.author, group=cls.group)
+            for i in range(5)
+        ])
+        Post.objects.filter(text=f'{POST_TEXT} 0').update(
+            pub_date='2020-01-01T00:00:00Z'
+        )
+        Comment.objects.create(
+            post=Post.objects.first(), author=cls.user, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def export(self, *args):
+        stdout = StringIO()
+        call_command('export_data', *args, stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_ndjson_export(self):
+        """Каждая строка NDJSON - одна запись, пакеты не теряют строк."""
+        lines = self.export('--chunk-size', '2').splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(
+            [row['model'] for row in rows],
+            ['groups'] + ['posts'] * 5 + ['comments', 'follows']
+        )
+        posts = [row['id'] for row in rows if row['model'] == 'posts']
+        self.assertEqual(posts, sorted(Post.objects.values_list(
+            'pk', flat=True
+        )))
+
+    def test_date_range(self):
+        """Период ограничивает посты по дате публикации."""
+        output = self.export('posts', '--since', '2021-01-01')
+        self.assertEqual(len(output.splitlines()), 4)
+        output = self.export('posts', '--until', '2021-01-01')
+        self.assertEqual(json.loads(output)['text'], f'{POST_TEXT} 0')
+
+    def test_gzip_csv_files(self):
+        """CSV пишется сжатым в файл на каждую модель."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.export('--format', 'csv', '--gzip', '--output', directory)
+        with gzip.open(os.path.join(directory, 'follows.csv.gz'), 'rt',
+                       newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows, [
+            ['id', 'user_id', 'author_id'],
+            [str(Follow.objects.get().pk), str(self.user.pk),
+             str(self.author.pk)],
+        ])
@@ -1,13 +1,20 @@
 from http import HTTPStatus
+from io import BytesIO, StringIO
 import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase, override_settings
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
+from PIL import Image
 
+from ..images import release_image
 from ..models import Post, Group, Comment
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -17,6 +24,15 @@ GROUP_SLUG = 'test-slug'
 GROUP_DESCRIPTION = 'Тест описание'
 USER_USERNAME = 'Anonimus'
 POST_TEXT = 'Тестовая запись для тестового поста номер'
+HASHED_JPG = r'^posts/[0-9a-f]{64}\.jpg$'
+
+
+def png_upload(name, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', (20, 20), color).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name=name, content=buffer.getvalue(), content_type='image/png'
+    )
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -81,7 +97,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(last_post.group, self.the_post.group)
         self.assertEqual(last_post.author, self.the_post.author)
         self.assertEqual(last_post.text, 'simple test')
-        self.assertEqual(last_post.image, 'posts/small.gif')
+        self.assertRegex(last_post.image.name, HASHED_JPG)
 
     def test_post_edit(self):
         """Валидная форма редактирования поста"""
@@ -139,6 +155,130 @@ class PostCreateFormTests(TestCase):
             new_group_response.context['page_obj'].paginator.count, 1
         )
 
+    def test_image_normalized(self):
+        """Картинка уменьшается, теряет EXIF и перекодируется в JPEG."""
+        photo = Image.new('RGB', (4000, 3000), 'red')
+        exif = photo.getexif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        photo.save(buffer, 'PNG', exif=exif.tobytes())
+        uploaded = SimpleUploadedFile(
+            name='photo.png',
+            content=buffer.getvalue(),
+            content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'photo', 'image': uploaded}
+        )
+        post = Post.objects.get(text='photo')
+
+        self.assertRegex(post.image.name, HASHED_JPG)
+        self.assertEqual(post.image_size, post.image.size)
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'JPEG')
+            self.assertEqual(stored.size, (1440, 1920))
+            self.assertNotIn(0x0112, stored.getexif())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_image_too_large(self):
+        """Слишком большой файл не принимается."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'big', 'image': png_upload('big.png')}
+        )
+
+        self.assertFalse(Post.objects.filter(text='big').exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Картинка больше 10\xa0байт'
+        )
+
+    def test_image_truncated(self):
+        """Обрезанная картинка не принимается, а не роняет страницу."""
+        buffer = BytesIO()
+        Image.effect_noise((200, 200), 50).convert('RGB').save(
+            buffer, 'JPEG'
+        )
+        uploaded = SimpleUploadedFile(
+            name='cut.jpg',
+            content=buffer.getvalue()[:buffer.tell() // 2],
+            content_type='image/jpeg'
+        )
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'cut', 'image': uploaded}
+        )
+
+        self.assertFalse(Post.objects.filter(text='cut').exists())
+        self.assertFormError(
+            response, 'form', 'image', 'Не удалось прочитать картинку'
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageDeduplicationTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=USER_USERNAME)
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, text, image):
+        self.client.post(
+            reverse('posts:post_create'),
+            data={'text': text, 'image': image}
+        )
+        return Post.objects.get(text=text)
+
+    def test_same_image_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом до последней ссылки."""
+        first = self.create_post('first', png_upload('a.png'))
+        second = self.create_post('second', png_upload('b.png'))
+        name = first.image.name
+
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(default_storage.listdir('posts')[1],
+                         [name.split('/')[1]])
+
+        self.client.post(reverse('posts:post_delete', args=(first.pk,)))
+        self.assertTrue(default_storage.exists(name))
+
+        self.client.post(
+            reverse('posts:post_edit', args=(second.pk,)),
+            data={'text': 'second', 'image': png_upload('c.png', 'blue')}
+        )
+        self.assertFalse(default_storage.exists(name))
+
+    def test_unreferenced_image_not_reused(self):
+        """Файл без ссылок не берется: его может удалять release_image."""
+        first = self.create_post('first', png_upload('a.png'))
+        name = first.image.name
+        Post.objects.filter(pk=first.pk).update(image='')
+
+        second = self.create_post('second', png_upload('b.png'))
+        self.assertNotEqual(second.image.name, name)
+
+        release_image(name)
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(second.image.name))
+
+    def test_dedupe_images_command(self):
+        """Команда переводит посты с копиями картинки на один файл."""
+        names = [
+            default_storage.save(f'posts/{name}', ContentFile(b'same'))
+            for name in ('a.jpg', 'b.jpg')
+        ]
+        for name in names:
+            Post.objects.create(author=self.user, text=name, image=name)
+
+        call_command('dedupe_images', stdout=StringIO())
+
+        images = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(images), 1)
+        self.assertEqual(default_storage.listdir('posts')[1],
+                         [images.pop().split('/')[1]])
+
 
 class CommentCreateFormTests(TestCase):
     @classmethod
@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..counters import rebuild_group_stats
+from ..models import Group, GroupAuthorStats, GroupStats, Post, User
+
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тест описание'
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+class GroupIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.other = User.objects.create_user(username=USER_USERNAME1)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION
+        )
+        cls.empty_group = Group.objects.create(
+            title='Пустая группа', slug='empty', description=''
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self):
+        return (
+            list(GroupStats.objects.order_by('group').values_list(
+                'group', 'posts_count', 'last_post_date'
+            )),
+            sorted(GroupAuthorStats.objects.filter(
+                posts_count__gt=0
+            ).values_list('group', 'author', 'posts_count')),
+        )
+
+    def test_signals_match_rebuild(self):
+        """Статистика, которую правят сигналы, совпадает с пересчетом."""
+        posts = [
+            Post.objects.create(text=POST_TEXT, author=author,
+                                group=self.group)
+            for author in (self.user, self.user, self.other)
+        ]
+        posts[-1].group = self.empty_group
+        posts[-1].save()
+        Post.objects.get(pk=posts[1].pk).delete()
+        incremental = self.stats()
+        rebuild_group_stats()
+        self.assertEqual(incremental, self.stats())
+        self.assertEqual(
+            GroupStats.objects.get(group=self.group).last_post_date,
+            posts[0].pub_date
+        )
+
+    def test_directory_page(self):
+        """Каталог упорядочен по числу постов и показывает авторов."""
+        for author in (self.other, self.other, self.user):
+            Post.objects.create(text=POST_TEXT, author=author,
+                                group=self.group)
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertTemplateUsed(response, 'posts/group_index.html')
+        page = list(response.context['page_obj'])
+        self.assertEqual(
+            [stats.group for stats in page], [self.group, self.empty_group]
+        )
+        self.assertEqual(
+            [(stats.author, stats.posts_count)
+             for stats in page[0].top_authors],
+            [(self.other, 2), (self.user, 1)]
+        )
+        self.assertEqual(page[1].top_authors, [])
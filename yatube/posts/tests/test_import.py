@@ -0,0 +1,106 @@
+from io import StringIO
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.conf import settings
+from PIL import Image
+
+from ..cache import get_comments_versions
+from ..models import Comment, Post
+from ..search import search_posts
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+GROUP_SLUG = 'test-slug'
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        Image.new('RGB', (40, 30), 'red').save(
+            os.path.join(self.directory, 'photo.png')
+        )
+        self.source = os.path.join(self.directory, 'data.ndjson')
+
+    def write(self, records):
+        with open(self.source, 'w') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+
+    def load(self, *args):
+        call_command('import_data', self.source, *args,
+                     stdout=StringIO(), stderr=StringIO())
+
+    def test_import_posts_and_comments(self):
+        """Посты и комментарии создаются со всеми побочными данными."""
+        self.write([
+            {'model': 'posts', 'id': 7, 'text': 'Старая запись',
+             'author': USER_USERNAME, 'group': GROUP_SLUG,
+             'pub_date': '2015-05-01T10:00:00Z', 'image': 'photo.png'},
+            {'model': 'posts', 'text': 'Без группы',
+             'author': USER_USERNAME1},
+            {'model': 'comments', 'post': 7, 'text': 'Комментарий',
+             'author': USER_USERNAME1},
+            {'model': 'comments', 'post': 8, 'text': 'Потерянный',
+             'author': USER_USERNAME1},
+        ])
+        self.load('--batch-size', '2')
+        post = Post.objects.get(text='Старая запись')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group.slug, GROUP_SLUG)
+        self.assertRegex(post.image.name, r'^posts/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(post.author.stats.posts_count, 1)
+        self.assertEqual(Comment.objects.get().post, post)
+        self.assertEqual(
+            list(search_posts('старая')[0:1]), [post]
+        )
+
+    def test_resume_from_checkpoint(self):
+        """После ошибки импорт продолжается без повторных записей."""
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        records = [
+            {'model': 'posts', 'text': f'{POST_TEXT} {i}',
+             'author': USER_USERNAME} for i in range(5)
+        ]
+        self.write(records[:2] + [{'model': 'posts'}] + records[3:])
+        with self.assertRaises(CommandError):
+            self.load('--batch-size', '2', '--checkpoint', checkpoint)
+        self.assertEqual(Post.objects.count(), 2)
+        self.write(records)
+        self.load('--batch-size', '2', '--checkpoint', checkpoint)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            sorted(record['text'] for record in records)
+        )
+
+    def test_comments_find_posts_of_earlier_runs(self):
+        """Комментарий находит пост из прошлого запуска по ключу импорта."""
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        post = {'model': 'posts', 'id': 1, 'text': POST_TEXT,
+                'author': USER_USERNAME}
+        self.write([post])
+        self.load('--checkpoint', checkpoint)
+        post_id = Post.objects.get().pk
+        versions = get_comments_versions([post_id])
+        self.write([post, {'model': 'comments', 'post': 1,
+                           'text': 'Позже', 'author': USER_USERNAME1}])
+        self.load('--checkpoint', checkpoint)
+        self.assertEqual(Comment.objects.get().post.text, POST_TEXT)
+        # закэшированные ленты с этим постом устарели
+        self.assertNotEqual(get_comments_versions([post_id]), versions)
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), {'done': 2})
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
 from ..models import Group, Post, Comment, Follow
@@ -124,3 +125,12 @@ class FollowModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     follow._meta.get_field(field).verbose_name, expected_value)
+
+    def test_follow_unique(self):
+        """Повторная подписка и подписка на себя запрещены в базе."""
+        for user, author in ((self.user, self.author),
+                             (self.user, self.user)):
+            with self.subTest(author=author):
+                with self.assertRaises(IntegrityError):
+                    with transaction.atomic():
+                        Follow.objects.create(user=user, author=author)
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post, User
+from ..popular import get_ranking, rebuild_popularity
+
+USER_USERNAME = 'Anonimus'
+
+
+class PopularTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.old_post = Post.objects.create(text='Старая', author=cls.user)
+        cls.new_post = Post.objects.create(text='Новая', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def ranked_ids(self):
+        return [pk for _, pk in get_ranking()]
+
+    def test_comments_raise_post(self):
+        """Комментарии поднимают пост в рейтинге и на странице."""
+        self.assertEqual(self.ranked_ids()[0], self.new_post.pk)
+        for text in ('Раз', 'Два'):
+            Comment.objects.create(
+                post=self.old_post, author=self.user, text=text
+            )
+        self.assertEqual(self.ranked_ids()[0], self.old_post.pk)
+        response = self.client.get(reverse('posts:popular'))
+        self.assertTemplateUsed(response, 'posts/index.html')
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.old_post.pk, self.new_post.pk]
+        )
+
+    def test_scores_decay(self):
+        """Давние комментарии весят меньше свежей публикации."""
+        Comment.objects.create(post=self.old_post, author=self.user, text='Да')
+        long_ago = timezone.now() - timezone.timedelta(days=10)
+        Post.objects.filter(pk=self.old_post.pk).update(pub_date=long_ago)
+        Comment.objects.filter(post=self.old_post).update(created=long_ago)
+        rebuild_popularity()
+        self.assertEqual(
+            self.ranked_ids(), [self.new_post.pk, self.old_post.pk]
+        )
+
+    def test_incremental_matches_rebuild(self):
+        """Счет, набранный по событиям, совпадает с полным пересчетом."""
+        self.ranked_ids()
+        for number in range(3):
+            Comment.objects.create(
+                post=self.old_post, author=self.user, text=str(number)
+            )
+        incremental = get_ranking()
+        rebuild_popularity()
+        rebuilt = get_ranking()
+        self.assertEqual(
+            [pk for _, pk in incremental], [pk for _, pk in rebuilt]
+        )
+        for (score, _), (expected, _) in zip(incremental, rebuilt):
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_deleted_post_leaves_ranking(self):
+        self.ranked_ids()
+        Post.objects.get(pk=self.new_post.pk).delete()
+        self.assertEqual(self.ranked_ids(), [self.old_post.pk])
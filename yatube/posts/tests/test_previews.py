@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User, Follow
+
+GROUP_TITLE = 'Тестовая группа'
+GROUP_SLUG = 'test-slug'
+GROUP_DESCRIPTION = 'Тест описание'
+USER_USERNAME = 'Anonimus'
+USER_USERNAME1 = 'Vasya'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+class FeedCommentsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        cls.author = User.objects.create_user(username=USER_USERNAME1)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESCRIPTION
+        )
+        cls.posts = [
+            Post.objects.create(text=f'{POST_TEXT} {i}', author=cls.author,
+                                group=cls.group)
+            for i in range(3)
+        ]
+        cls.comments = [
+            Comment.objects.create(post=cls.posts[0], author=cls.user,
+                                   text=f'Комментарий {i}')
+            for i in range(4)
+        ]
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    @override_settings(FEED_COMMENT_PREVIEW=2)
+    def test_feed_pages_show_latest_comments(self):
+        """Ленты показывают число и последние комментарии постов."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.author.username,)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                posts = {
+                    post.pk: post for post in response.context['page_obj']
+                }
+                commented = posts[self.posts[0].pk]
+                self.assertEqual(commented.comments_count, 4)
+                self.assertEqual(
+                    [(comment['text'], comment['username'])
+                     for comment in commented.latest_comments],
+                    [('Комментарий 3', self.user.username),
+                     ('Комментарий 2', self.user.username)]
+                )
+                self.assertEqual(posts[self.posts[1].pk].latest_comments, [])
+                self.assertContains(response, 'Комментариев: 4')
+                self.assertContains(response, 'Комментарий 3')
+                self.assertNotContains(response, 'Комментарий 1')
+
+    def test_queries_do_not_depend_on_page_size(self):
+        """Комментарии всех постов страницы читаются одним запросом."""
+        for post in self.posts[1:]:
+            Comment.objects.create(post=post, author=self.user, text='Еще')
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        counts = []
+        for per_page in (1, len(self.posts)):
+            with self.settings(POST_COUNT=per_page), \
+                    CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_new_comment_refreshes_index(self):
+        """Новый комментарий сбрасывает закэшированную главную."""
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'Новый комментарий'
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=(self.posts[1].pk,)),
+            {'text': 'Новый комментарий'}
+        )
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Новый комментарий'
+        )
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.conf import settings
+
+from ..models import Post, User
+
+USER_USERNAME = 'Anonimus'
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username=USER_USERNAME)
+        self.rare = Post.objects.create(
+            text='Прогулка, потом набережная', author=self.user
+        )
+        self.often = Post.objects.create(
+            text='Набережная, набережная и снова набережная',
+            author=self.user
+        )
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_ranked(self):
+        """Выдача упорядочена по релевантности."""
+        self.assertEqual(self.search('набережная'), [self.often, self.rare])
+        self.assertEqual(self.search('прогулка "набережная"'), [self.rare])
+        self.assertEqual(self.search('ПРОГУЛКА OR'), [])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_search_ranks_all_matches(self):
+        """Ранжируются все совпадения, а не только самые свежие."""
+        Post.objects.create(text='Набережная вдалеке', author=self.user)
+        self.assertEqual(self.search('набережная'), [self.often])
+
+    def test_search_index_synced(self):
+        """Индекс следует за изменением и удалением постов."""
+        self.rare.text = 'Прогулка по парку'
+        self.rare.save()
+        self.assertEqual(self.search('набережная'), [self.often])
+        self.assertEqual(self.search('парку'), [self.rare])
+
+        self.often.delete()
+        self.assertEqual(self.search('набережная'), [])
+
+    def test_search_pagination(self):
+        """Ссылки на страницы выдачи сохраняют запрос."""
+        Post.objects.bulk_create([
+            Post(text=f'Набережная {i}', author=self.user)
+            for i in range(settings.POST_COUNT)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'набережная'}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         settings.POST_COUNT + 2)
+        self.assertContains(response, 'href="?q=%D0%BD')
+
+    @override_settings(SEARCH_BACKEND='posts.search.SimpleSearchBackend')
+    def test_simple_backend(self):
+        """Запасной бэкенд находит посты без полнотекстового индекса."""
+        self.assertEqual(self.search('Прогулка'), [self.rare])
@@ -0,0 +1,60 @@
+from io import BytesIO
+import shutil
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.conf import settings
+from PIL import Image
+
+from ..cache import get_feed_version
+from ..models import Post, User
+from ..templatetags.post_thumbnails import post_thumbnail
+from ..thumbnails import THUMBNAIL_GEOMETRIES, generate_thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+USER_USERNAME = 'Anonimus'
+POST_TEXT = 'Тестовая запись для тестового поста номер'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        user = User.objects.create_user(username=USER_USERNAME)
+        image = BytesIO()
+        Image.new('RGB', (50, 50), 'red').save(image, 'PNG')
+        cls.post = Post.objects.create(
+            text=POST_TEXT,
+            author=user,
+            image=SimpleUploadedFile('red.png', image.getvalue()),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnails_pregenerated(self):
+        """Готовые миниатюры отдаются шаблону вместо оригинала.
+
+        Создание миниатюр меняет версию ленты, чтобы кэш страниц
+        с оригиналом устарел.
+        """
+        image = self.post.image
+        version = get_feed_version()
+        # фоновый пул не входит в бюджет запросов, базы он не трогает
+        with self.assertNumQueries(0):
+            self.assertTrue(generate_thumbnails(image.name))
+        self.assertNotEqual(get_feed_version(), version)
+        # готовые миниатюры ленту не сбрасывают
+        version = get_feed_version()
+        self.assertTrue(generate_thumbnails(image.name))
+        self.assertEqual(get_feed_version(), version)
+        for geometry in THUMBNAIL_GEOMETRIES:
+            with self.subTest(geometry=geometry):
+                thumbnail = post_thumbnail(image, geometry)
+                self.assertNotEqual(thumbnail.url, image.url)
+                self.assertTrue(default_storage.exists(thumbnail.name))
@@ -3,11 +3,15 @@ from http import HTTPStatus
 from django import forms
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.conf import settings
 
-from ..models import Comment, Group, Post, User, Follow
+from core.query_budget import QueryBudgetTestMixin
+
+from ..models import Comment, FeedItem, Group, Post, User, Follow
 
 GROUP_TITLE = 'Тестовая группа'
 GROUP_SLUG = 'test-slug'
@@ -39,6 +43,33 @@ class Cache_pageTests(TestCase):
         self.post.delete()
         self.assertFalse(Post.objects.filter(author=self.user_author).exists())
 
+    def test_cache_fragment_invalidated(self):
+        """Список постов берется из кэша и сбрасывается новым постом."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse(any('posts_post' in query['sql']
+                             for query in queries.captured_queries))
+        new_post = Post.objects.create(text='Свежий пост',
+                                       author=self.user_author)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, new_post.text)
+        self.assertContains(response, self.user_author.username)
+
+    def test_cache_fragment_ignores_foreign_params(self):
+        """Ключ фрагмента зависит только от параметров страницы."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'utm_source': 'mail'})
+        self.assertFalse(any('posts_post' in query['sql']
+                             for query in queries.captured_queries))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, {'page': 1})
+        self.assertTrue(any('posts_post' in query['sql']
+                            for query in queries.captured_queries))
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -82,6 +113,41 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']),
                                  expected)
 
+    def test_cursor_paginator(self):
+        """Переход по курсорам вперед и назад без COUNT."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        with CaptureQueriesContext(connection) as queries:
+            first_page = self.client.get(url).context['page_obj']
+        self.assertFalse(any('COUNT' in query['sql']
+                             for query in queries.captured_queries))
+        self.assertIsNone(first_page.previous_cursor)
+        second_page = self.client.get(
+            f'{url}?after={first_page.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(len(second_page), SECOND_PAGE_COUNT)
+        self.assertIsNone(second_page.next_cursor)
+        self.assertEqual(
+            (second_page.has_previous(), second_page.has_next()),
+            (True, False)
+        )
+        back_page = self.client.get(
+            f'{url}?before={second_page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertIsNone(back_page.previous_cursor)
+        with self.assertNumQueries(0):
+            self.assertFalse(back_page.has_previous())
+            self.assertTrue(back_page.has_next())
+            self.assertEqual(back_page.next_page_number(), 2)
+
+    def test_broken_cursor(self):
+        """Битый курсор - 404, а не молча первая страница."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        for cursor in ('after=broken', 'before=%%%', 'after=MjAyMHwx'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f'{url}?{cursor}')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
 
 class PostPagesTests(TestCase):
     @classmethod
@@ -327,6 +393,45 @@ class PostPagesTests(TestCase):
         )
         self.assertIn(self.comment, response.context['comments'])
 
+    def test_comments_only_for_this_post(self):
+        """На странице поста только его комментарии, по страницам."""
+        other_post = Post.objects.create(
+            text=POST_TEXT,
+            author=self.user_author,
+        )
+        other_comment = Comment.objects.create(
+            post=other_post,
+            author=self.user,
+            text='Чужой комментарий',
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.settings(COMMENT_COUNT=1):
+            first_page = self.guest_client.get(url).context['comments']
+            second_page = self.guest_client.get(
+                f'{url}?after={first_page.next_cursor}'
+            ).context['comments']
+        self.assertNotIn(other_comment, first_page)
+        self.assertEqual(len(first_page), 1)
+        self.assertEqual(list(second_page), [self.comment])
+
+    def test_numbered_comment_pages_keep_order(self):
+        """?page=N листает комментарии в том же порядке, что и курсоры."""
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Второй комментарий'
+        )
+        comments = list(Comment.objects.filter(
+            post=self.post
+        ).order_by('created', 'pk'))
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.settings(COMMENT_COUNT=1):
+            numbered = [
+                list(self.guest_client.get(
+                    f'{url}?page={number}'
+                ).context['comments'])
+                for number in range(1, len(comments) + 1)
+            ]
+        self.assertEqual(numbered, [[comment] for comment in comments])
+
 
 class FollowViewTest(TestCase):
     @classmethod
@@ -391,3 +496,97 @@ class FollowViewTest(TestCase):
         self.assertFalse(Follow.objects.filter(
             user=self.user, author=self.author
         ).exists())
+
+    def test_feed_materialized_on_write(self):
+        """Новый пост раскладывается в ленту, отписка ее чистит."""
+        new_post = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.assertTrue(FeedItem.objects.filter(
+            user=self.user, post=new_post
+        ).exists())
+        self.follow.delete()
+        self.assertFalse(FeedItem.objects.filter(user=self.user).exists())
+
+    def test_popular_author_read_on_request(self):
+        """Посты популярного автора дочитываются в ленту при запросе."""
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            new_post = Post.objects.create(text=POST_TEXT,
+                                           author=self.author)
+            response = self.authorized_client.get(
+                reverse('posts:follow_index')
+            )
+        self.assertFalse(FeedItem.objects.filter(post=new_post).exists())
+        self.assertIn(new_post, response.context['page_obj'])
+        self.assertIn(self.post, response.context['page_obj'])
+
+    def test_popular_follower_skips_feed_items(self):
+        """Подписчику популярного автора срез FeedItem не читается."""
+        url = reverse('posts:follow_index')
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            self.authorized_client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client.get(url)
+        self.assertIn(self.post, response.context['page_obj'])
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if 'FROM "posts_feeditem" INNER JOIN' in query['sql']
+        ])
+        # подсказка хранится на сервере, cookie страница не ставит
+        self.assertFalse(response.cookies)
+
+    def test_backfill_copies_whole_history(self):
+        """Новый подписчик получает в ленту все посты автора."""
+        Post.objects.bulk_create([
+            Post(text=POST_TEXT, author=self.author) for _ in range(30)
+        ])
+        Follow.objects.create(user=self.n_follower, author=self.author)
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.n_follower).count(),
+            self.author.posts.count()
+        )
+
+    def test_feeds_restored_when_author_not_popular(self):
+        """Посты и подписки, пока автор был популярен, не теряются."""
+        other = User.objects.create_user(username='other')
+        with self.settings(FEED_FANOUT_LIMIT=2):
+            Follow.objects.create(user=other, author=self.author)
+            # третий подписчик делает автора популярным
+            Follow.objects.create(user=self.n_follower, author=self.author)
+            new_post = Post.objects.create(text=POST_TEXT,
+                                           author=self.author)
+            self.assertFalse(FeedItem.objects.filter(
+                user=self.n_follower
+            ).exists())
+            Follow.objects.get(user=other, author=self.author).delete()
+        for user in (self.user, self.n_follower):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    set(FeedItem.objects.filter(user=user).values_list(
+                        'post', flat=True
+                    )),
+                    {self.post.pk, new_post.pk}
+                )
+
+
+class QueryBudgetViewsTest(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=USER_USERNAME)
+        groups = [
+            Group.objects.create(title=f'{GROUP_TITLE} {i}',
+                                 slug=f'{GROUP_SLUG}-{i}')
+            for i in range(settings.POST_COUNT)
+        ]
+        for group in groups:
+            Post.objects.create(text=POST_TEXT, author=cls.user, group=group)
+
+    def test_profile_without_n_plus_one(self):
+        """Профиль загружает авторов и группы постов одним запросом."""
+        with self.assertQueryBudget(3):
+            self.client.get(
+                reverse('posts:profile', args=(self.user.username,))
+            )
+
+    def test_group_index_without_n_plus_one(self):
+        """Каталог читает авторов всех групп страницы одним запросом."""
+        with self.assertQueryBudget(3):
+            self.client.get(reverse('posts:group_index'))
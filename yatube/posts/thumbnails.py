@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import bump_feed_version
+
+logger = logging.getLogger(__name__)
+
+# размеры, в которых шаблоны показывают картинки постов
+THUMBNAIL_GEOMETRIES = ('960x339', '300x100')
+# миниатюра картинки posts/x.jpg лежит в thumbnails/960x339/posts/x.jpg
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_QUALITY = 85
+# битая картинка не пересоздается при каждом показе страницы
+FAILED_TTL = 60 * 5
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class Thumbnail:
+    """Готовая миниатюра: имя в хранилище и адрес для шаблона."""
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
+
+def thumbnail_name(name, geometry):
+    return f'{THUMBNAIL_DIR}/{geometry}/{name}'
+
+
+def ready_key(name):
+    digest = hashlib.md5(name.encode()).hexdigest()
+    return f'posts:thumbnails:{digest}'
+
+
+def get_ready_thumbnails(name):
+    """Готовность миниатюр картинки по кэшу, без обращения к хранилищу.
+
+    True - миниатюры созданы, False - их не удалось создать,
+    None - о картинке еще ничего не известно.
+    """
+    return cache.get(ready_key(name))
+
+
+def save_thumbnail(source, geometry, name):
+    width, height = map(int, geometry.split('x'))
+    # как crop=center и upscale у sorl: заполняем размер и режем края
+    image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+    image_format = source.format or 'JPEG'
+    options = {}
+    if image_format == 'JPEG':
+        image = image.convert('RGB')
+        options = {'quality': THUMBNAIL_QUALITY, 'optimize': True}
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    default_storage.save(name, ContentFile(output.getvalue()))
+
+
+def generate_thumbnails(name):
+    """Создает все миниатюры картинки, которых еще нет.
+
+    Работает только с файлами и кэшем и не обращается к базе данных,
+    поэтому безопасно выполняется в фоновом потоке или процессе.
+    Пока миниатюр нет, страницы показывают оригинал, поэтому
+    после их создания версия ленты меняется, и закэшированные
+    фрагменты и валидаторы с оригиналом устаревают. Если все
+    миниатюры уже были, страницы их и показывали, и версия
+    остается прежней.
+    """
+    created = False
+    try:
+        source = None
+        for geometry in THUMBNAIL_GEOMETRIES:
+            target = thumbnail_name(name, geometry)
+            if default_storage.exists(target):
+                continue
+            if source is None:
+                with default_storage.open(name) as image_file:
+                    source = Image.open(image_file)
+                    source.load()
+            save_thumbnail(source, geometry, target)
+            created = True
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+        cache.set(ready_key(name), False, FAILED_TTL)
+        return False
+    finally:
+        with _lock:
+            _pending.discard(name)
+    cache.set(ready_key(name), True, None)
+    if created:
+        bump_feed_version()
+    return True
+
+
+def delete_thumbnails(name):
+    """Удаляет все миниатюры картинки."""
+    for geometry in THUMBNAIL_GEOMETRIES:
+        default_storage.delete(thumbnail_name(name, geometry))
+    cache.delete(ready_key(name))
+
+
+def enqueue_thumbnails(name):
+    """Ставит генерацию миниатюр в очередь фонового пула потоков."""
+    global _executor
+    if not settings.THUMBNAIL_WORKERS:
+        generate_thumbnails(name)
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    _executor.submit(generate_thumbnails, name)
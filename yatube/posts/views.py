@@ -1,76 +1,276 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
+from django.http import Http404
+from django.shortcuts import render, get_object_or_404, redirect
 from django.conf import settings
-from django.views.decorators.cache import cache_page
-
-from .forms import CommentForm, PostForm
-from .models import Comment, Group, Post, User, Follow
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.functional import SimpleLazyObject
 
+from core.query_budget import query_budget
 
-CACHE_SEC = 20
+from .cache import (get_comments_versions, get_feed_version,
+                    get_follows_popular, set_follows_popular)
+from .concurrent import run_concurrently
+from .conditional import (feed_state, has_validators, newest, page_comments,
+                          page_response, post_state, remember_page)
+from .feeds import follow_feed, popular_follows
+from .forms import CommentForm, PostForm
+from .models import (Comment, Group, GroupAuthorStats, GroupStats, Post,
+                     User, Follow)
+from .paginator import CursorPaginator, InvalidCursor
+from .popular import get_ranking
+from .previews import with_latest_comments
+from .search import search_posts
 
 
-def get_page(request, post_list):
-    paginator = Paginator(post_list, settings.POST_COUNT)
+def get_page(request, post_list, per_page=None, key='-pub_date',
+             tiebreak='pk'):
+    paginator = CursorPaginator(
+        post_list, per_page or settings.POST_COUNT,
+        key=key, tiebreak=tiebreak
+    )
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        return paginator.get_page(page_number)
+    try:
+        return paginator.get_cursor_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before')
+        )
+    except InvalidCursor as error:
+        raise Http404(str(error))
 
 
-@cache_page(CACHE_SEC, key_prefix='index_page')
+@query_budget(4)
 def index(request):
     post_list = Post.objects.all().select_related('author', 'group')
-    page_obj = get_page(request, post_list)
+    page_obj = SimpleLazyObject(lambda: remember_page(
+        request, with_latest_comments(get_page(request, post_list))
+    ))
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'index': True,
+        'feed_version': f'{get_feed_version()}-{page_comments(request)}',
+        'cache_ttl': settings.INDEX_CACHE_TTL,
     }
-    return render(request, template, context)
+    # главная и так берется из кэша по версии ленты
+    state, modified = feed_state()
+    return page_response(
+        request, state, modified,
+        lambda: render(request, template, context), with_comments=True
+    )
 
 
-def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('author')
-    page_obj = get_page(request, posts)
-    template = 'posts/group_list.html'
+@query_budget(4)
+def popular(request):
+    """Посты по убыванию популярности.
+
+    Страница - срез закэшированного рейтинга и один запрос постов
+    по id, поэтому ее цена не зависит от номера и числа постов.
+    """
+    ids = Paginator([pk for _, pk in get_ranking()], settings.POST_COUNT)
+    page_ids = ids.get_page(request.GET.get('page'))
+    page_version = '.'.join(map(str, page_ids))
+    comments = get_comments_versions(page_ids)
+
+    def load_page():
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            list(page_ids)
+        )
+        page_ids.object_list = [posts[pk] for pk in page_ids if pk in posts]
+        return with_latest_comments(page_ids)
+
+    template = 'posts/index.html'
     context = {
-        'group': group,
-        'page_obj': page_obj,
+        'page_obj': SimpleLazyObject(load_page),
+        'popular': True,
+        'feed_version': f'{get_feed_version()}-{page_version}-{comments}',
+        'cache_ttl': settings.INDEX_CACHE_TTL,
     }
     return render(request, template, context)
 
 
-def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    page_obj = get_page(request, author_posts)
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user, author=author).exists()
+@query_budget(6)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = Paginator(search_posts(query), settings.POST_COUNT)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    template = 'posts/search.html'
     context = {
-        'author': author,
+        'query': query,
         'page_obj': page_obj,
-        'following': following
+        'page_query': urlencode({'q': query}) + '&',
     }
-    template = 'posts/profile.html'
     return render(request, template, context)
 
 
-def post_detail(request, post_id):
-    post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
-        id=post_id
+def with_top_authors(group_stats, limit):
+    """Добавляет к статистике групп id первых limit авторов по постам.
+
+    Каждый id - подзапрос LIMIT 1 OFFSET n по индексу (группа, -постов),
+    поэтому его цена не зависит от числа авторов группы.
+    """
+    return group_stats.annotate(**{
+        f'top_author_{position}': Subquery(
+            GroupAuthorStats.objects.filter(
+                group=OuterRef('group'), posts_count__gt=0
+            ).order_by('-posts_count', 'author').values('pk')
+            [position:position + 1]
+        )
+        for position in range(limit)
+    })
+
+
+@query_budget(5)
+def group_index(request):
+    """Каталог групп со статистикой.
+
+    Числа берутся из таблиц статистики, которые сигналы постов
+    правят на месте, поэтому страница не агрегирует посты.
+    """
+    stats = GroupStats.objects.select_related('group').order_by(
+        '-posts_count', 'group'
     )
-    form = CommentForm(request.POST or None,
-                       files=request.FILES or None)
-    posts_comments = Comment.objects.select_related('author', 'post')
-    template = 'posts/post_detail.html'
-    context = {'post': post,
-               'form': form,
-               'comments': posts_comments}
-    return render(request, template, context)
+    state, modified = feed_state()
+
+    def build():
+        limit = settings.GROUP_TOP_AUTHORS
+        paginator = Paginator(
+            with_top_authors(stats, limit), settings.GROUP_COUNT
+        )
+        # число групп считается без подзапросов авторов
+        paginator.count = stats.count()
+        page_obj = paginator.get_page(request.GET.get('page'))
+        positions = [f'top_author_{position}' for position in range(limit)]
+        authors = GroupAuthorStats.objects.select_related('author').in_bulk([
+            getattr(group_stats, name)
+            for group_stats in page_obj for name in positions
+        ])
+        for group_stats in page_obj:
+            group_stats.top_authors = [
+                authors[getattr(group_stats, name)] for name in positions
+                if getattr(group_stats, name) is not None
+            ]
+        template = 'posts/group_index.html'
+        return render(request, template, {'page_obj': page_obj})
+    return page_response(request, state, modified, build)
 
 
+@query_budget(6)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    posts = group.posts.select_related('author')
+    state, modified = feed_state(group.posts.all())
+    state = (state, group.title, group.description)
+
+    def build():
+        template = 'posts/group_list.html'
+        context = {
+            'group': group,
+            'page_obj': remember_page(
+                request, with_latest_comments(get_page(request, posts))
+            ),
+        }
+        return render(request, template, context)
+    return page_response(request, state, modified, build, with_comments=True)
+
+
+@query_budget(7)
+def profile(request, username):
+    """Профиль автора.
+
+    Подписка, валидатор и страница постов читаются одновременно.
+    Страница читается заранее, только если запрос не может
+    закончиться 304.
+    """
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    author_posts = author.posts.select_related('author', 'group')
+
+    def posts_page():
+        return remember_page(
+            request, with_latest_comments(get_page(request, author_posts))
+        )
+
+    # пользователь читается из сессии в этом потоке, а не в пуле
+    user = request.user if request.user.is_authenticated else None
+    calls = [
+        lambda: feed_state(author.posts.all()),
+        lambda: user is not None and Follow.objects.filter(
+            user=user, author=author).exists(),
+    ]
+    if not has_validators(request):
+        calls.append(posts_page)
+    (state, modified), following, *page = run_concurrently(*calls)
+    stats = getattr(author, 'stats', None)
+    state = (state, author.get_full_name(), following,
+             stats and (stats.posts_count, stats.followers_count,
+                        stats.following_count))
+
+    def build():
+        context = {
+            'author': author,
+            'page_obj': page[0] if page else posts_page(),
+            'following': following
+        }
+        template = 'posts/profile.html'
+        return render(request, template, context)
+    return page_response(request, state, modified, build, with_comments=True)
+
+
+@query_budget(6)
+def post_detail(request, post_id):
+    """Пост с комментариями.
+
+    Пост, дата последнего комментария и страница комментариев
+    зависят только от post_id и читаются одновременно.
+    """
+    comments = Comment.objects.filter(post_id=post_id)
+
+    def comments_page():
+        return get_page(
+            request,
+            comments.select_related('author'),
+            per_page=settings.COMMENT_COUNT,
+            key='created'
+        )
+
+    calls = [
+        lambda: get_object_or_404(
+            Post.objects.select_related('author__stats', 'group'),
+            id=post_id
+        ),
+        lambda: newest(comments, 'created'),
+    ]
+    if not has_validators(request):
+        calls.append(comments_page)
+    post, latest, *page = run_concurrently(*calls)
+    state, modified = post_state(post, latest)
+    stats = getattr(post.author, 'stats', None)
+    state = (state, stats and stats.posts_count)
+
+    def build():
+        form = CommentForm(request.POST or None,
+                           files=request.FILES or None)
+        template = 'posts/post_detail.html'
+        context = {'post': post,
+                   'form': form,
+                   'comments': page[0] if page else comments_page()}
+        return render(request, template, context)
+    return page_response(request, state, modified, build)
+
+
+@query_budget(17)
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(request.POST or None,
@@ -85,7 +285,9 @@ def post_create(request):
     return redirect('posts:profile', request.user.username)
 
 
+@query_budget(18)
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if post.author != request.user:
@@ -105,7 +307,9 @@ def post_edit(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+@query_budget(16)
 @login_required
+@transaction.atomic
 def post_delete(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if post.author != request.user:
@@ -114,7 +318,9 @@ def post_delete(request, post_id):
     return redirect('posts:profile', username=post.author)
 
 
+@query_budget(8)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -126,18 +332,48 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
-    following_posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page(request, following_posts)
+    """Лента подписок.
+
+    Обычно читатель не подписан на популярных авторов, и лента -
+    срез FeedItem, поэтому он читается одновременно с проверкой
+    подписок. Читатель, у которого в прошлый раз нашлись популярные
+    подписки, сразу получает ленту из Post без лишнего чтения среза.
+    """
+    user = request.user
+
+    def read_items():
+        page = get_page(request, follow_feed(user, popular=()),
+                        tiebreak='post_id')
+        # страницы ?page=N ленивы, читаем их здесь, а не в шаблоне
+        page.object_list = [item.post for item in page.object_list]
+        return page
+
+    follows_popular = get_follows_popular(user.pk)
+    if follows_popular:
+        popular, items = popular_follows(user), None
+    else:
+        popular, items = run_concurrently(
+            lambda: popular_follows(user), read_items
+        )
+    if follows_popular != bool(popular):
+        set_follows_popular(user.pk, bool(popular))
+    if popular:
+        page_obj = get_page(request, follow_feed(user, popular))
+    else:
+        page_obj = items if items is not None else read_items()
     template = 'posts/follow.html'
     context = {
-        'page_obj': page_obj,
+        'page_obj': with_latest_comments(page_obj),
     }
     return render(request, template, context)
 
 
+@query_budget(15)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -149,7 +385,9 @@ def profile_follow(request, username):
     return redirect('posts:profile', username=username)
 
 
+@query_budget(15)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(author=author, user=request.user).delete()
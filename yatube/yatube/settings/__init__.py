@@ -0,0 +1,26 @@
+"""Профиль настроек выбирается переменной окружения DJANGO_ENV.
+
+prod - по умолчанию, как на сервере без DJANGO_ENV, dev - только
+явно, для локальной разработки с DEBUG и debug_toolbar, test -
+включается сам при запуске тестов. Профиль можно указать
+и напрямую: DJANGO_SETTINGS_MODULE=yatube.settings.dev.
+"""
+import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.getenv('DJANGO_ENV')
+if DJANGO_ENV is None and ('test' in sys.argv or 'pytest' in sys.modules):
+    DJANGO_ENV = 'test'
+
+if DJANGO_ENV in (None, 'prod'):
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'test':
+    from .test import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный DJANGO_ENV={DJANGO_ENV}: нужен dev, test или prod'
+    )
@@ -0,0 +1,224 @@
+"""
+Django settings for yatube project, common for all profiles.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = '&pwid-thmm^bz5rpqxpv$*critg81&jqh!69hci01u=or*5q+9'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+        'www.julianka.pythonanywhere.com',
+        'julianka.pythonanywhere.com',
+]
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'core.apps.CoreConfig',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
+]
+
+MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.query_budget.QueryBudgetMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+
+TEMPLATES = [
+    {
+        'BACKEND': 'core.template_backend.InstrumentedDjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# потоки, в которых ASGI-приложение выполняет view
+ASGI_THREADS = 8
+# потоки для независимых запросов внутри view; 0 - выполнять по очереди
+CONCURRENT_QUERY_THREADS = 4
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+# LOGOUT_REDIRECT_URL = 'posts:index'
+
+#  подключаем движок filebased.EmailBackend
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# указываем директорию, в которую будут складываться файлы писем
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+POST_COUNT = 10
+COMMENT_COUNT = 20
+# последние комментарии под каждым постом в лентах
+FEED_COMMENT_PREVIEW = 3
+# групп на странице каталога и самых активных авторов у каждой
+GROUP_COUNT = 20
+GROUP_TOP_AUTHORS = 3
+# авторы с большим числом подписчиков читаются в ленту при запросе
+FEED_FANOUT_LIMIT = 1000
+# сколько секунд прокси может отдавать страницу анонима без проверки
+PAGE_CACHE_S_MAXAGE = 60
+# популярное: вклад событий убывает вдвое за POPULAR_HALF_LIFE секунд
+POPULAR_HALF_LIFE = 60 * 60 * 24
+POPULAR_COMMENT_WEIGHT = 1.0
+POPULAR_FOLLOWER_WEIGHT = 0.5
+# длина закэшированного рейтинга и время до его перечитывания из базы
+POPULAR_SIZE = 500
+POPULAR_TTL = 60
+# потоки, которые заранее готовят миниатюры картинок постов;
+# 0 - строить сразу после коммита
+THUMBNAIL_WORKERS = 2
+# загруженные картинки уменьшаются и перекодируются в форме поста
+POST_IMAGE_MAX_SIDE = 1920
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_QUALITY = 85
+# None - бэкенд по СУБД: FTS5 в SQLite, icontains в остальных
+SEARCH_BACKEND = None
+SEARCH_MAX_RESULTS = 1000
+# доля запросов, у которых считаются SQL-запросы; в строгом
+# режиме превышение бюджета view и N+1 роняют запрос, иначе
+# пишутся в лог
+QUERY_BUDGET_SAMPLE_RATE = 0.01
+QUERY_BUDGET_STRICT = False
+QUERY_REPEAT_THRESHOLD = 5
+# доля запросов, профилируемых cProfile, например 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+# /metrics/ отдается только с заголовком Authorization: Bearer <токен>;
+# без токена страницы метрик нет
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Общий для всех воркеров кэш задается окружением, например:
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CACHE_LOCATION=/var/tmp/yatube_cache
+# или MemcachedCache с CACHE_LOCATION=127.0.0.1:11211.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# фрагменты главной сбрасываются сменой версии ленты в кэше.
+# Кэш LocMem у каждого процесса свой, и другой воркер о смене
+# не узнает, поэтому долгий TTL - только с общим кэшем
+SHARED_CACHE = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+INDEX_CACHE_TTL = 60 * 60 * 6 if SHARED_CACHE else 20
@@ -0,0 +1,25 @@
+from copy import deepcopy
+
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+DEBUG = True
+
+INSTALLED_APPS = INSTALLED_APPS + ['sorl.thumbnail', 'debug_toolbar']
+MIDDLEWARE = MIDDLEWARE + ['debug_toolbar.middleware.DebugToolbarMiddleware']
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['OPTIONS']['context_processors'].insert(
+    0, 'django.template.context_processors.debug'
+)
+# шаблоны берутся из кэша, пока не изменится файл
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('core.template_loaders.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+# шаблоны debug_toolbar находит app_directories внутри загрузчика выше
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
+QUERY_BUDGET_SAMPLE_RATE = 1.0
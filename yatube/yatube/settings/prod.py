@@ -0,0 +1,31 @@
+import os
+from copy import deepcopy
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, MIDDLEWARE, SECRET_KEY, TEMPLATES
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', SECRET_KEY)
+
+# соединение с базой живет между запросами
+DATABASES = deepcopy(DATABASES)
+DATABASES['default']['CONN_MAX_AGE'] = int(
+    os.getenv('DB_CONN_MAX_AGE', 60)
+)
+
+# шаблоны компилируются один раз на процесс
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+if not float(os.getenv('PROFILE_SAMPLE_RATE', 0)):
+    MIDDLEWARE = [
+        name for name in MIDDLEWARE
+        if name != 'core.profiling.ProfilingMiddleware'
+    ]
@@ -0,0 +1,11 @@
+from .base import *  # noqa: F401,F403
+
+# миниатюры строятся сразу после коммита, чтобы фоновый поток
+# не писал во временный MEDIA_ROOT, пока тест его удаляет
+THUMBNAIL_WORKERS = 0
+
+# превышение бюджета SQL-запросов и N+1 роняют тест
+QUERY_BUDGET_SAMPLE_RATE = 1.0
+QUERY_BUDGET_STRICT = True
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']